@@ -286,6 +286,30 @@
 #define PERSIST_ENV_VAR     "__AFL_PERSISTENT"
 #define DEFER_ENV_VAR       "__AFL_DEFER_FORKSRV"
 
+/* Hit counters of the Logger, shared with the coverage collector
+   (logger_cov.py) the way the trace bits are shared with afl-fuzz. Counter
+   2 * N counts the entries to the function of the Nth target (line) of
+   DAFL_TARGET_FILE, and 2 * N + 1 the hits of its line: */
+
+#define LOGGER_SHM_ENV_VAR  "__LOGGER_SHM_ID"
+#define LOGGER_MAP_SIZE     256
+
+/* The last counter is not a hit counter, but holds the id of the input being
+   run, set by the coverage collector: */
+
+#define LOGGER_INPUT_SLOT   (LOGGER_MAP_SIZE - 1)
+
+/* File to which __logger_log_value() appends its binary records (u32 input id,
+   u32 variable id, s64 value): */
+
+#define LOGGER_VALUE_ENV_VAR "__LOGGER_VALUE_FILE"
+
+/* The Logger pass records the variables listed after the Nth target of
+   DAFL_TARGET_FILE with the variable id (N << LOGGER_VAR_SHIFT) | <index of the
+   variable in the list>: */
+
+#define LOGGER_VAR_SHIFT    16
+
 /* In-code signatures for deferred and persistent mode. */
 
 #define PERSIST_SIG         "##SIG_AFL_PERSISTENT##"
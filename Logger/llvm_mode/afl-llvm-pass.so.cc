@@ -38,13 +38,17 @@
 #include <fstream>
 #include <sstream>
 #include <set>
+#include <vector>
 
 #include <stdio.h>
 #include <stdlib.h>
 #include <unistd.h>
 
 #include "llvm/ADT/Statistic.h"
+#include "llvm/BinaryFormat/Dwarf.h"
+#include "llvm/IR/DebugInfoMetadata.h"
 #include "llvm/IR/IRBuilder.h"
+#include "llvm/IR/IntrinsicInst.h"
 #include "llvm/IR/LegacyPassManager.h"
 #include "llvm/IR/Module.h"
 #include "llvm/Support/Debug.h"
@@ -54,7 +58,18 @@
 
 using namespace llvm;
 
-std::string instr_target;
+// Target locations, one 'file:func:line' per line of the target file. The hits
+// of the Nth target are counted in counters 2 * N and 2 * N + 1, so that one
+// build covers every bug of a program. The line may be followed by
+// ':var,var,...', the variables whose values are recorded (see
+// LOGGER_VAR_SHIFT in config.h) each time the target line is about to run. A
+// variable is a local or global name, followed by '.member's and preceded by
+// '*'s, e.g. 'edt.eat_addr' or '*bufferptr'.
+struct Target {
+  std::string file, func, line;
+  std::vector<std::string> vars;
+};
+std::vector<Target> instr_targets;
 
 namespace {
 
@@ -74,98 +89,270 @@ namespace {
 // Pass the file containing the target location information as an environment variable
 void initTarget(char* target_file) {
   std::ifstream stream(target_file);
-  std::getline(stream, instr_target);
+  std::string instr_target;
+  while (std::getline(stream, instr_target)) {
+    if (instr_target.empty())
+      continue;
+    Target T;
+    std::stringstream ss(instr_target);
+    std::getline(ss, T.file, ':');
+    std::getline(ss, T.func, ':');
+    std::getline(ss, T.line, ':');
+    std::string var;
+    while (std::getline(ss, var, ','))
+      if (!var.empty())
+        T.vars.push_back(var);
+    instr_targets.push_back(T);
+  }
+  if (instr_targets.size() * 2 > LOGGER_INPUT_SLOT)
+    FATAL("Too many targets in %s", target_file);
 }
 
 void initialize(void) {
   char* target_file = getenv("DAFL_TARGET_FILE");
-  if (target_file) {
+  if (target_file && instr_targets.empty()) {
     initTarget(target_file);
   }
 }
 
 char AFLCoverage::ID = 0;
-static const char *CoverageFunctionName = "puts";
-
-Function *getCoverageFunction(Module &M) {
-  LLVMContext &Ctx = M.getContext();
-  Type* StringType = Type::getInt8PtrTy(Ctx);
-  Type* ArgsTypes[] = {StringType};
-  FunctionType *FType = FunctionType::get(Type::getInt32Ty(Ctx), ArgsTypes, false);
-  Value *Coverage = dyn_cast<Value>(M.getOrInsertFunction(CoverageFunctionName, FType).getCallee());
-  if (Function *F = dyn_cast<Function>(Coverage)) {
-    return F;
-  } else {
-    errs() << "WARN: invalid function\n";
-    return NULL;
+
+// Bump the hit counter 'idx' (see LOGGER_MAP_SIZE in config.h) at 'IP'. The
+// counters live in the shared memory of the coverage collector, like the trace
+// bits of afl-fuzz, so no output is needed to tell what a run has reached.
+void insertHit(Module &M, GlobalVariable *HitPtr, BasicBlock::iterator IP,
+               unsigned idx) {
+  LLVMContext &C = M.getContext();
+  IntegerType *Int32Ty = IntegerType::getInt32Ty(C);
+  IRBuilder<> IRB(&(*IP));
+
+  LoadInst *HitMap = IRB.CreateLoad(PointerType::get(Int32Ty, 0), HitPtr);
+  HitMap->setMetadata(M.getMDKindID("nosanitize"), MDNode::get(C, None));
+  Value *HitCell = IRB.CreateGEP(Int32Ty, HitMap, ConstantInt::get(Int32Ty, idx));
+  LoadInst *Counter = IRB.CreateLoad(Int32Ty, HitCell);
+  Counter->setMetadata(M.getMDKindID("nosanitize"), MDNode::get(C, None));
+  Value *Incr = IRB.CreateAdd(Counter, ConstantInt::get(Int32Ty, 1));
+  IRB.CreateStore(Incr, HitCell)
+      ->setMetadata(M.getMDKindID("nosanitize"), MDNode::get(C, None));
+}
+
+// 'Ty' without its typedefs and qualifiers.
+static DIType *stripType(DIType *Ty) {
+  while (DIDerivedType *DT = dyn_cast_or_null<DIDerivedType>(Ty)) {
+    unsigned tag = DT->getTag();
+    if (tag != dwarf::DW_TAG_typedef && tag != dwarf::DW_TAG_const_type &&
+        tag != dwarf::DW_TAG_volatile_type && tag != dwarf::DW_TAG_restrict_type)
+      break;
+    Ty = DT->getBaseType();
   }
+  return Ty;
+}
 
+// The variable 'name' as seen at 'IP' of 'F', with its debug type: the address
+// of a local in memory or of a global ('is_addr'), or else the last value a
+// local promoted to a register got in the block of 'IP'.
+static Value *findVariable(Function &F, Instruction *IP, const std::string &name,
+                           DIType *&Ty, bool &is_addr) {
+  for (auto &BB : F)
+    for (auto &inst : BB)
+      if (DbgDeclareInst *DDI = dyn_cast<DbgDeclareInst>(&inst))
+        if (DDI->getVariable()->getName() == name && DDI->getAddress()) {
+          Ty = DDI->getVariable()->getType();
+          is_addr = true;
+          return DDI->getAddress();
+        }
+
+  for (Instruction *I = IP->getPrevNode(); I; I = I->getPrevNode()) {
+    DbgValueInst *DVI = dyn_cast<DbgValueInst>(I);
+    if (!DVI || DVI->getVariable()->getName() != name)
+      continue;
+    Value *V = DVI->getValue();
+    if (!V || isa<UndefValue>(V) || DVI->getExpression()->getNumElements())
+      return NULL;
+    Ty = DVI->getVariable()->getType();
+    is_addr = false;
+    return V;
+  }
+
+  GlobalVariable *GV = F.getParent()->getGlobalVariable(name, true);
+  if (GV) {
+    SmallVector<DIGlobalVariableExpression *, 1> GVEs;
+    GV->getDebugInfo(GVEs);
+    if (!GVEs.empty()) {
+      Ty = GVEs[0]->getVariable()->getType();
+      is_addr = true;
+      return GV;
+    }
+  }
   return NULL;
 }
 
+// Emit the load of the variable 'expr' (see Target) before 'IP', as a 64-bit
+// integer. Returns NULL if it is not an integer or pointer variable of 'F'.
+static Value *loadVariable(Module &M, Function &F, Instruction *IP,
+                           const std::string &expr) {
+  LLVMContext &C = M.getContext();
+  MDNode *NoSan = MDNode::get(C, None);
+  unsigned NoSanKind = M.getMDKindID("nosanitize");
+  Type *Int8PtrTy = Type::getInt8PtrTy(C);
+  IRBuilder<> IRB(IP);
+
+  std::size_t derefs = expr.find_first_not_of('*');
+  if (derefs == std::string::npos)
+    return NULL;
+  std::vector<std::string> path;
+  std::stringstream ss(expr.substr(derefs));
+  std::string name;
+  while (std::getline(ss, name, '.'))
+    path.push_back(name);
+
+  DIType *Ty = NULL;
+  bool is_addr = false;
+  Value *V = findVariable(F, IP, path[0], Ty, is_addr);
+  if (!V)
+    return NULL;
+
+  for (unsigned i = 1; i < path.size(); i++) {
+    DICompositeType *CT = dyn_cast_or_null<DICompositeType>(stripType(Ty));
+    if (!is_addr || !CT)
+      return NULL;
+    DIDerivedType *Member = NULL;
+    for (DINode *E : CT->getElements()) {
+      DIDerivedType *DT = dyn_cast<DIDerivedType>(E);
+      if (DT && DT->getTag() == dwarf::DW_TAG_member && DT->getName() == path[i])
+        Member = DT;
+    }
+    if (!Member || Member->isBitField())
+      return NULL;
+    V = IRB.CreateConstGEP1_64(IRB.getInt8Ty(), IRB.CreatePointerCast(V, Int8PtrTy),
+                               Member->getOffsetInBits() / 8);
+    Ty = Member->getBaseType();
+  }
+
+  for (unsigned i = 0; i < derefs; i++) {
+    DIType *PT = stripType(Ty);
+    if (!PT || PT->getTag() != dwarf::DW_TAG_pointer_type)
+      return NULL;
+    if (is_addr) {
+      LoadInst *Ptr = IRB.CreateLoad(
+          Int8PtrTy, IRB.CreatePointerCast(V, PointerType::get(Int8PtrTy, 0)));
+      Ptr->setMetadata(NoSanKind, NoSan);
+      V = Ptr;
+    } else if (!V->getType()->isPointerTy()) {
+      return NULL;
+    }
+    Ty = cast<DIDerivedType>(PT)->getBaseType();
+    is_addr = true;
+  }
+
+  Ty = stripType(Ty);
+  if (!Ty)
+    return NULL;
+  bool is_signed = false;
+  if (DIBasicType *BT = dyn_cast<DIBasicType>(Ty)) {
+    unsigned enc = BT->getEncoding();
+    if (enc == dwarf::DW_ATE_float)
+      return NULL;
+    is_signed = enc == dwarf::DW_ATE_signed || enc == dwarf::DW_ATE_signed_char;
+  } else if (Ty->getTag() != dwarf::DW_TAG_pointer_type &&
+             Ty->getTag() != dwarf::DW_TAG_enumeration_type) {
+    return NULL;
+  }
+  uint64_t bits = Ty->getSizeInBits();
+  if (bits != 8 && bits != 16 && bits != 32 && bits != 64)
+    return NULL;
+
+  IntegerType *IntTy = IntegerType::get(C, bits);
+  if (is_addr) {
+    LoadInst *Load = IRB.CreateLoad(
+        IntTy, IRB.CreatePointerCast(V, PointerType::get(IntTy, 0)));
+    Load->setMetadata(NoSanKind, NoSan);
+    V = Load;
+  } else if (V->getType()->isPointerTy()) {
+    V = IRB.CreatePtrToInt(V, IntTy);
+  } else if (!V->getType()->isIntegerTy()) {
+    return NULL;
+  }
+  return IRB.CreateIntCast(V, IRB.getInt64Ty(), is_signed);
+}
+
+// Pass the values of the variables of the target 'idx' to __logger_log_value()
+// right before 'inst', the first instruction of the target line in its block.
+void insertValueLog(Module &M, Function &F, Instruction &inst, unsigned idx) {
+  const Target &T = instr_targets[idx];
+  LLVMContext &C = M.getContext();
+  FunctionCallee LogValue = M.getOrInsertFunction(
+      "__logger_log_value", Type::getVoidTy(C), Type::getInt32Ty(C),
+      Type::getInt64Ty(C));
+
+  Instruction *IP = &inst;
+  if (isa<PHINode>(IP) || IP->isEHPad())
+    IP = &(*inst.getParent()->getFirstInsertionPt());
+
+  for (unsigned var_idx = 0; var_idx < T.vars.size(); var_idx++) {
+    Value *V = loadVariable(M, F, IP, T.vars[var_idx]);
+    if (!V) {
+      WARNF("Cannot record %s at %s:%s", T.vars[var_idx].c_str(),
+            T.file.c_str(), T.line.c_str());
+      continue;
+    }
+    IRBuilder<> IRB(IP);
+    u32 var_id = (idx << LOGGER_VAR_SHIFT) | var_idx;
+    IRB.CreateCall(LogValue, {IRB.getInt32(var_id), V});
+  }
+}
+
 bool AFLCoverage::runOnModule(Module &M) {
 
   initialize();
-  std::stringstream ss(instr_target);
-  std::string target_file, target_func, target_line;
-  std::getline(ss, target_file, ':');
-  std::getline(ss, target_func, ':');
-  std::getline(ss, target_line);
 
   std::string file_name = M.getSourceFileName();
   std::size_t tokloc = file_name.find_last_of('/');
   if (tokloc != std::string::npos) {
     file_name = file_name.substr(tokloc + 1, std::string::npos);
   }
-  if (file_name.compare(target_file) != 0)
-    return true;
 
-  for (auto &F : M) {
-    const std::string func_name = F.getName().str();
-    std::string msg = std::string("[FUNCTION] ") + file_name + std::string(":") + func_name +  std::string("\n");
-    if (func_name.compare(target_func) != 0)
+  GlobalVariable *HitPtr = NULL;
+  for (unsigned idx = 0; idx < instr_targets.size(); idx++) {
+    const Target &T = instr_targets[idx];
+    if (file_name.compare(T.file) != 0)
       continue;
-      
-    bool is_first_BB = true;
-    for (auto &BB : F) {
-      // Insert function coverage
-      if( is_first_BB ) {
-        BasicBlock::iterator IP = BB.getFirstInsertionPt();
-        IRBuilder<> IRB(&(*IP));
-        std::vector<Value *> Args;
-        Value *Str = IRB.CreateGlobalStringPtr(msg.c_str());
-        Args.push_back(Str);
-        Function *Fun = getCoverageFunction(M);
-        CallInst *Call = IRB.CreateCall(Fun, Args, "");
-        Call->setCallingConv(CallingConv::C);
-        Call->setTailCall(true);
-        is_first_BB = false;
-      }
 
-      for (auto &inst : BB) {
-        DebugLoc dbg = inst.getDebugLoc();
-        DILocation* DILoc = dbg.get();
-
-        if (!DILoc || !DILoc->getLine()) 
-          continue;  
-
-        std::string line_str = std::to_string(DILoc->getLine());
-        if (line_str.compare(target_line) != 0)
-          continue;
-        
-        std::string line_msg = std::string("\n[LINE] ") + file_name + std::string(":") + line_str;
-        BasicBlock::iterator IP = BB.getFirstInsertionPt();
-        IRBuilder<> IRB(&(*IP));
-        std::vector<Value *> Args;
-        Value *Str = IRB.CreateGlobalStringPtr(line_msg.c_str());
-        Args.push_back(Str);
-        Function *Fun = getCoverageFunction(M);
-        CallInst *Call = IRB.CreateCall(Fun, Args, "");
-        Call->setCallingConv(CallingConv::C);
-        Call->setTailCall(true);
-        break;
-      }
+    if (!HitPtr)
+      HitPtr = new GlobalVariable(
+          M, PointerType::get(IntegerType::getInt32Ty(M.getContext()), 0), false,
+          GlobalValue::ExternalLinkage, 0, "__logger_hit_ptr");
+
+    for (auto &F : M) {
+      const std::string func_name = F.getName().str();
+      if (func_name.compare(T.func) != 0)
+        continue;
+
+      bool is_first_BB = true;
+      for (auto &BB : F) {
+        // Insert function coverage
+        if( is_first_BB ) {
+          insertHit(M, HitPtr, BB.getFirstInsertionPt(), 2 * idx);
+          is_first_BB = false;
+        }
 
+        for (auto &inst : BB) {
+          DebugLoc dbg = inst.getDebugLoc();
+          DILocation* DILoc = dbg.get();
+
+          if (!DILoc || !DILoc->getLine()) 
+            continue;  
+
+          std::string line_str = std::to_string(DILoc->getLine());
+          if (line_str.compare(T.line) != 0)
+            continue;
+
+          insertHit(M, HitPtr, BB.getFirstInsertionPt(), 2 * idx + 1);
+          insertValueLog(M, F, inst, idx);
+          break;
+        }
+
+      }
     }
   }
   return true;
@@ -36,6 +36,7 @@
 #include <unistd.h>
 #include <string.h>
 #include <assert.h>
+#include <fcntl.h>
 
 #include <sys/mman.h>
 #include <sys/shm.h>
@@ -65,6 +66,11 @@ u32* __afl_area_dfg_ptr = __afl_area_initial_dfg;
 
 __thread u32 __afl_prev_loc;
 
+/* Hit counters of the targets, bumped by the Logger pass. */
+
+u32  __logger_hit_initial[LOGGER_MAP_SIZE];
+u32* __logger_hit_ptr = __logger_hit_initial;
+
 
 /* Running in persistent mode? */
 
@@ -77,6 +83,16 @@ static void __afl_map_shm(void) {
 
   u8 *id_str = getenv(SHM_ENV_VAR);
   u8 *id_str_dfg = getenv(SHM_ENV_VAR_DFG);
+  u8 *id_str_logger = getenv(LOGGER_SHM_ENV_VAR);
+
+  /* The coverage collector attaches the hit counters only. */
+
+  if (id_str_logger) {
+
+    __logger_hit_ptr = shmat(atoi(id_str_logger), NULL, 0);
+    if (__logger_hit_ptr == (void *)-1) _exit(1);
+
+  }
 
   /* If we're running under AFL, attach to the appropriate region, replacing the
      early-stage __afl_area_initial region that is needed to allow some really
@@ -105,6 +121,46 @@ static void __afl_map_shm(void) {
 }
 
 
+/* Record the value of a watched variable, called by the Logger pass at the
+   target lines in place of the '@@@ <var> is <value>' prints. Each record is a
+   fixed-width binary one, appended with a single write() to the file in
+   LOGGER_VALUE_ENV_VAR, so that the values can be mapped and analysed without
+   parsing text. Without the variable, values are not recorded. */
+
+struct logger_value_rec {
+  u32 input_id;
+  u32 var_id;
+  s64 value;
+};
+
+void __logger_log_value(u32 var_id, s64 value) {
+
+  static s32 value_fd = -1;
+  static u8  value_init;
+  struct logger_value_rec rec;
+
+  if (!value_init) {
+
+    u8* value_file = getenv(LOGGER_VALUE_ENV_VAR);
+    if (value_file)
+      value_fd = open(value_file, O_WRONLY | O_CREAT | O_APPEND, 0600);
+    value_init = 1;
+
+  }
+
+  if (value_fd < 0) return;
+
+  rec.input_id = __logger_hit_ptr[LOGGER_INPUT_SLOT];
+  rec.var_id   = var_id;
+  rec.value    = value;
+
+  /* Stop recording rather than leave partial records behind. */
+
+  if (write(value_fd, &rec, sizeof(rec)) != sizeof(rec)) value_fd = -1;
+
+}
+
+
 /* Fork server logic. */
 
 static void __afl_start_forkserver(void) {
@@ -4,6 +4,8 @@
 
 # arg1 : Target project
 # arg2~: Fuzzing targets
+# Each program is built once with the targets of all its bugs. The Nth bug of
+# /benchmark/bin/Logger/<program>.bugs has the Nth pair of hit counters.
 function build_with_Logger() {
     CC="/fuzzer/Logger/afl-clang-fast"
     CXX="/fuzzer/Logger/afl-clang-fast++"
@@ -13,19 +15,28 @@ function build_with_Logger() {
 
         str_array=($TARG)
         BIN_NAME=${str_array[0]}
+        if [[ -z $BIN_NAME ]]; then
+            continue
+        fi
         if  [[ $BIN_NAME == "readelf" || $BIN_NAME == "objdump-2.31.1" ]]; then
             BIT_OPT="-m32"
         else
             BIT_OPT=""
         fi
 
+        export DAFL_TARGET_FILE="/benchmark/target/logger/$BIN_NAME.all"
+        rm -f $DAFL_TARGET_FILE /benchmark/bin/Logger/$BIN_NAME.bugs
+        for BUG_NAME in "${str_array[@]:1}"; do
+            echo "$(head -n 1 /benchmark/target/logger/$BIN_NAME/$BUG_NAME)" >> $DAFL_TARGET_FILE
+            echo $BUG_NAME >> /benchmark/bin/Logger/$BIN_NAME.bugs
+        done
+        build_target $1 $CC $CXX "-fsanitize=address $BIT_OPT"
+        ### copy results
+        cp RUNDIR-$1/$BIN_NAME /benchmark/bin/Logger/$BIN_NAME || exit 1
         for BUG_NAME in "${str_array[@]:1}"; do
-            export DAFL_TARGET_FILE="/benchmark/target/logger/$BIN_NAME/$BUG_NAME"
-            build_target $1 $CC $CXX "-fsanitize=address $BIT_OPT"
-            ### copy results
             copy_build_result $1 $BIN_NAME $BUG_NAME "Logger"
-            rm -rf RUNDIR-$1
         done
+        rm -rf RUNDIR-$1
     done
 
     rm -rf RUNDIR-$1 || exit 1
@@ -39,7 +50,7 @@ build_with_Logger "libming-4.7" \
     "swftophp-4.7 2016-9827 2016-9829 2016-9831 2017-9988 2017-11728 2017-11729" &
 build_with_Logger "libming-4.7.1" "swftophp-4.7.1 2017-7578" &
 build_with_Logger "libming-4.8" \
-    "swftophp-4.8 2018-7868 2018-8807 2018-8962 2018-11095 2018-11225 2018-20427 2019-12982" &
+    "swftophp-4.8 2018-7868 2018-8807 2018-8962 2018-11095 2018-11225 2018-11226 2020-6628 2018-20427 2019-12982" &
 build_with_Logger "libming-4.8.1" "swftophp-4.8.1 2019-9114" &
 build_with_Logger "lrzip-9de7ccb" "" "lrzip-9de7ccb 2017-8846" &
 build_with_Logger "lrzip-ed51e14" "lrzip-ed51e14 2018-11496" &
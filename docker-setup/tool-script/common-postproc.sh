@@ -1,32 +1,17 @@
 #!/bin/bash
 
-# Replay newly found crash inputs
-rm output/crashes/README.txt
-CRASH_LIST=$(ls output/crashes)
+# Replay newly found crash inputs, in parallel on the cores of the container.
+rm -f output/crashes/README.txt
 
 # During the replay, set the following ASAN_OPTIONS again.
 export ASAN_OPTIONS=allocator_may_return_null=1,detect_leaks=0
 
 cp -f /benchmark/bin/ASAN/$1 ./$1
-echo "Crash Replay log for ${1}" > output/replay_log.txt
-
-for crash in $CRASH_LIST; do
-    DIFF_TIME=$(echo `stat -c%Y output/crashes/${crash}` - $START_TIME | bc)
-    readarray -d , -t CRASH_ID <<<$crash
-
-    echo -e "\nReplaying crash - ${crash} (found at ${DIFF_TIME} sec.):" >> output/replay_log.txt
-    # echo -e "\nReplaying crash - ${crash} (found at ${DIFF_TIME} sec.):" >> output/replay_log.txt
-    if [[ $3 == "stdin" ]]; then
-        cat output/crashes/$crash | timeout -k 30 15 ./$1 $2 2>> output/replay_log.txt
-    elif [[ $3 == "file" ]]; then
-        cp -f output/crashes/$crash ./@@
-        timeout -k 30 15 ./$1 $2 2>> output/replay_log.txt
-        echo "Exit value is $(echo $?)" >> output/replay_log.txt
-    else
-        echo "Invalid input source: $3"
-        exit 1
-    fi
-done
+# A failed replay must not cost the rest of the post-processing, nor the output
+# of the campaign.
+if ! python3 $(dirname $0)/replay.py $1 "$2" $3 $START_TIME; then
+    echo "[Warning] Crash replay failed, replay_log.txt may be incomplete"
+fi
 
 ## Record timestamp of seeds
 echo "Seed info for ${1}" > output/seed_log.txt
@@ -38,28 +23,31 @@ for seed in $SEED_LIST; do
 done
 
 
-## Record the coverage of seeds
-SEED_LIST=$(ls output/queue)
-cp -f /benchmark/bin/Logger/$1 ./$1
-mkdir output/coverage
-for seed in $SEED_LIST; do
-    if [[ $3 == "stdin" ]]; then
-        cat output/queue/$seed | timeout -k 30 15 ./$1 $2 > log  2>&1
-        grep "\[FUNCTION\]" log | head -n 1 >> output/coverage/$seed
-        grep "\[LINE\]" log | head -n 1 >> output/coverage/$seed
-    elif [[ $3 == "file" ]]; then
-        cp -f output/queue/$seed ./@@
-        timeout -k 30 15 ./$1 $2 > log  2>&1
-        grep "\[FUNCTION\]" log | head -n 1 >> output/coverage/$seed
-        grep "\[LINE\]" log | head -n 1 >> output/coverage/$seed
-    fi
-done
+## Record the coverage of seeds, through the forkserver of the Logger build.
+## The program is built once for all its bugs (e.g. cxxfilt for
+## cxxfilt-2016-4487), and the coverage of every bug is recorded.
+## Programs without a Logger build get no coverage.
+LOGGER_BIN=${1%-*-*}
+if [ -f /benchmark/bin/Logger/$LOGGER_BIN.bugs ]; then
+    cp -f /benchmark/bin/Logger/$LOGGER_BIN ./$1
+    python3 $(dirname $0)/logger_cov.py $1 "$2" $3 /benchmark/bin/Logger/$LOGGER_BIN.bugs
+fi
 
 # To save storage space.
 # rm -rf output/queue/
 
-# Copy the output directory to the path visible by the host.
-cp -r output /output
+# Copy the output directory to the path visible by the host. With OUTPUT_MODE
+# set to 'volume' it is already there, and with 'tar' the host reads it from
+# /box/output.
+if [[ -z $OUTPUT_MODE ]] || [[ $OUTPUT_MODE == "copy" ]]; then
+    cp -r output /output
+fi
 
 # Notify that the whole fuzzing campaign has successfully finished.
 echo "FINISHED" > /STATUS
+# If the host watches a status directory, report there as well. Write to a
+# temporary file first, so that the host never sees a partial report.
+if [ -d /host-status ] && [ -n "$STATUS_NAME" ]; then
+    echo "FINISHED" > /host-status/$STATUS_NAME.tmp
+    mv /host-status/$STATUS_NAME.tmp /host-status/$STATUS_NAME
+fi
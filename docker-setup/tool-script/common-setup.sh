@@ -1,26 +1,57 @@
 #!/bin/bash
 
-if [ $# -ne 4 ] && [ $# -ne 5 ]; then
-    echo "Usage: $0 <target program> <cmdline> <source> <timeout> (option)"
+if [ $# -lt 4 ] || [ $# -gt 6 ]; then
+    echo "Usage: $0 <target program> <cmdline> <source> <timeout> (option) (instances)"
     exit 1
 fi
+TARGET=$1
+CMDLINE=$2
+SOURCE=$3
+TIMEOUT=$4
+INSTANCE_NUM=${6:-1}
 
-# Prepare a fresh working directory.
-rm -rf /box
-mkdir /box
+# Prepare a fresh working directory with target program, seed, and dictionary,
+# unless a warm container has it staged already.
+if [[ "$(cat /box/.staged 2> /dev/null)" != "$FUZZER_NAME $1" ]]; then
+    rm -rf /box
+    mkdir /box
+    cd /box
+    cp /benchmark/bin/$FUZZER_NAME/$1 ./$1
+    if [ -d "/benchmark/seed/$1" ]; then
+        cp -r /benchmark/seed/$1 ./seed
+    else
+        mkdir seed
+        cp /benchmark/seed/empty ./seed/
+    fi
+    if [ -f "/benchmark/dict/$1" ]; then
+        cp /benchmark/dict/$1 ./dict
+    fi
+    echo "$FUZZER_NAME $1" > .staged
+fi
 cd /box
+if [ -f dict ]; then
+    DICT_OPT="-x dict"
+fi
+if [[ -n $STAGE_ONLY ]]; then
+    exit 0
+fi
 
-# Prepare target program, seed, and dictionary.
-cp /benchmark/bin/$FUZZER_NAME/$1 ./$1
-if [ -d "/benchmark/seed/$1" ]; then
-    cp -r /benchmark/seed/$1 ./seed
-else
-    mkdir seed
-    cp /benchmark/seed/empty ./seed/
+# With OUTPUT_MODE=volume, the output directory of the experiment is mounted at
+# /host-output and the fuzzer writes its output there directly.
+if [[ $OUTPUT_MODE == "volume" ]]; then
+    ln -s /host-output/$OUTPUT_NAME output
 fi
-if [ -f "/benchmark/dict/$1" ]; then
-    cp /benchmark/dict/$1 ./dict
-    DICT_OPT="-x dict"
+
+# With EXTEND set, the host has put the queue of a previous campaign in
+# /box/resume/output and its crashes in /box/resume/crashes, with their
+# original found-at times as mtime. afl-fuzz resumes from the queue, and the
+# campaign keeps the clock of the previous one (CAMPAIGN_START).
+if [[ -n $EXTEND ]]; then
+    if [[ $OUTPUT_MODE == "volume" ]]; then
+        cp -a resume/output/. output/
+    else
+        mv resume/output output
+    fi
 fi
 
 # TODO: Try removing these options later.
@@ -31,4 +62,74 @@ export UBSAN_OPTIONS=print_stacktrace=1:halt_on_error=1
 # Remove ASAN_OPTIONS previously set for the build process. If the target binary
 # is compiled with ASAN, AFL will automatically set this variable appropriately.
 unset ASAN_OPTIONS
-START_TIME=`date "+%s"`
+START_TIME=${CAMPAIGN_START:-`date "+%s"`}
+
+# Run the afl-fuzz command given as arguments (without '-o' and the target) for
+# the time limit. With more than one instance, a main instance and secondary
+# instances sync through 'output', and their findings are merged afterwards.
+# With EARLY_STOP set, the fuzzers are stopped once the targeted crash is found.
+# With EXTEND set, the fuzzer resumes from 'output' instead of the seeds.
+run_fuzzer() {
+    local args=("$@")
+    if [[ -n $EXTEND ]]; then
+        for i in "${!args[@]}"; do
+            if [[ ${args[$i]} == "-i" ]]; then
+                args[$((i + 1))]="-"
+            fi
+        done
+    fi
+    local watcher=""
+    if [[ -n $EARLY_STOP ]]; then
+        python3 $(dirname $0)/early_stop.py $TARGET "$CMDLINE" $SOURCE $START_TIME &
+        watcher=$!
+    fi
+    if [[ $INSTANCE_NUM -le 1 ]]; then
+        timeout $TIMEOUT "${args[@]}" -o output -- ./$TARGET $CMDLINE
+    else
+        run_parallel_fuzzers "${args[@]}"
+    fi
+    if [[ -n $watcher ]]; then
+        kill $watcher 2> /dev/null
+        wait $watcher
+    fi
+    if [[ -n $EXTEND ]]; then
+        merge_old_crashes
+    fi
+}
+
+# afl-fuzz numbers the crashes of a resumed campaign from zero again, so the
+# new crashes are renumbered after the ones of the previous campaign.
+merge_old_crashes() {
+    local old_num=$(ls resume/crashes 2> /dev/null | wc -l)
+    mkdir -p output/crashes resume/crashes resume/new-crashes
+    for crash in $(ls output/crashes | grep "^id:"); do
+        local id=$(printf "%06d" $((10#${crash:3:6} + old_num)))
+        mv output/crashes/$crash resume/new-crashes/id:$id${crash:9}
+    done
+    find resume/crashes resume/new-crashes -type f -exec mv -t output/crashes {} +
+}
+
+run_parallel_fuzzers() {
+    # afl-fuzz does not accept '-d' along with '-M' or '-S', and '-S' already
+    # skips the deterministic stages.
+    local opts=()
+    local main_opt="-M"
+    for opt in "$@"; do
+        if [[ $opt == "-d" ]]; then
+            main_opt="-S"
+        else
+            opts+=("$opt")
+        fi
+    done
+    local pids=()
+    timeout $TIMEOUT "${opts[@]}" -o output $main_opt main \
+      -- ./$TARGET $CMDLINE > /dev/null 2>&1 &
+    pids+=($!)
+    for i in $(seq 2 $INSTANCE_NUM); do
+        timeout $TIMEOUT "${opts[@]}" -o output -S sec-$i \
+          -- ./$TARGET $CMDLINE > /dev/null 2>&1 &
+        pids+=($!)
+    done
+    wait ${pids[@]}
+    python3 $(dirname $0)/merge_sync.py output
+}
@@ -0,0 +1,60 @@
+import sys, os, glob, time, shutil, subprocess
+from replay import replay_crash
+
+sys.path.insert(0, "/benchmark/scripts")
+from benchmark import check_targeted_crash
+
+# Runs next to the fuzzer with EARLY_STOP set. Every new crash is replayed with
+# the ASAN build, like common-postproc.sh does, and checked with the triage
+# function of the target. Once the targeted crash is confirmed, the fuzzers are
+# stopped so that the campaign ends and the cores go to the next work item.
+
+SCAN_INTERVAL = 5
+REPLAY_DIR = "/box/early-stop"
+RESULT_FILE = "output/early_stop.txt"
+ADDITIONAL_INFO_SIG = " is located "
+ASAN_OPTIONS = "allocator_may_return_null=1,detect_leaks=0"
+
+
+def list_crashes():
+    # A single fuzzer writes to output/crashes, parallel ones to
+    # output/<instance>/crashes.
+    paths = glob.glob("output/crashes/id:*") + glob.glob("output/*/crashes/id:*")
+    return sorted(paths, key=lambda path: os.stat(path).st_mtime)
+
+
+def main():
+    if len(sys.argv) != 5:
+        print("Usage: %s <target program> <cmdline> <source> <start time>" % sys.argv[0])
+        exit(1)
+    targ, cmdline, src, start_time = sys.argv[1:]
+    start_time = int(start_time)
+
+    os.environ["ASAN_OPTIONS"] = ASAN_OPTIONS
+    os.makedirs(REPLAY_DIR, exist_ok=True)
+    shutil.copy("/benchmark/bin/ASAN/" + targ, os.path.join(REPLAY_DIR, targ))
+    checked = set()
+    while True:
+        time.sleep(SCAN_INTERVAL)
+        for path in list_crashes():
+            if path in checked:
+                continue
+            checked.add(path)
+            found_time = os.stat(path).st_mtime - start_time
+            name = os.path.basename(path)
+            replay_buf = "%s (found at %d sec.):\n" % (name, found_time)
+            replay_buf += replay_crash(os.path.join(REPLAY_DIR, targ), cmdline, src,
+                                       path, REPLAY_DIR)
+            if ADDITIONAL_INFO_SIG in replay_buf:
+                replay_buf = replay_buf[:replay_buf.find(ADDITIONAL_INFO_SIG)]
+            if check_targeted_crash(targ, replay_buf):
+                f = open(RESULT_FILE, "w")
+                f.write("Stopped at crash - %s (found at %.3f sec.)\n" % (path, found_time))
+                f.close()
+                # afl-fuzz exits cleanly on SIGINT.
+                subprocess.run(["pkill", "-INT", "-x", "afl-fuzz"])
+                return
+
+
+if __name__ == "__main__":
+    main()
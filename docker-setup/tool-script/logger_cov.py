@@ -0,0 +1,137 @@
+import sys, os, select, signal, struct, subprocess
+from logger_shm import HitMap
+
+# Run every seed of output/queue through the forkserver of the Logger build of
+# the target program, and write which seeds reach the function and the line of
+# each bug of the program to one table, output/coverage.tsv. The binary is
+# started once and each seed costs a fork instead of an exec. What a run reached
+# is read from the hit counters the Logger keeps in shared memory (see
+# logger_shm.py). The values of watched variables that the target records go to
+# output/value_trace.bin, tagged with the id of the seed.
+
+QUEUE_DIR = "output/queue"
+COVERAGE_FILE = "output/coverage.tsv"
+VALUE_TRACE_FILE = "output/value_trace.bin"
+INPUT_FILE = "/box/logger_in"
+# Same as config.h of the Logger.
+FORKSRV_FD = 198
+LOGGER_VALUE_ENV_VAR = "__LOGGER_VALUE_FILE"
+TIMEOUT = 15
+
+
+class ForkServerError(Exception):
+    pass
+
+
+# Drives the AFL forkserver protocol: the server says hello with 4 bytes, then
+# for each 4 bytes it reads, it forks a child and replies with its pid, and
+# then with its wait status.
+class ForkServer:
+    def __init__(self, targ, cmdline, src, hits):
+        self.src = src
+        self.hits = hits
+        self.input_file = open(INPUT_FILE, "w+b")
+        ctl_r, self.ctl_w = os.pipe()
+        self.st_r, st_w = os.pipe()
+        os.dup2(ctl_r, FORKSRV_FD)
+        os.dup2(st_w, FORKSRV_FD + 1)
+        env = dict(os.environ)
+        env.update(hits.env())
+        env[LOGGER_VALUE_ENV_VAR] = os.path.abspath(VALUE_TRACE_FILE)
+        stdin = self.input_file if src == "stdin" else subprocess.DEVNULL
+        self.proc = subprocess.Popen(["./" + targ] + cmdline.split(), env=env,
+                                     stdin=stdin, stdout=subprocess.DEVNULL,
+                                     stderr=subprocess.DEVNULL,
+                                     pass_fds=(FORKSRV_FD, FORKSRV_FD + 1))
+        for fd in [ctl_r, st_w, FORKSRV_FD, FORKSRV_FD + 1]:
+            os.close(fd)
+        if self._read_int(TIMEOUT) is None:
+            self.close()
+            raise ForkServerError("%s does not start a forkserver" % targ)
+
+    def _read_int(self, timeout):
+        readable, _, _ = select.select([self.st_r], [], [], timeout)
+        if len(readable) == 0:
+            return None
+        buf = os.read(self.st_r, 4)
+        if len(buf) != 4:
+            raise ForkServerError("the forkserver is gone")
+        return struct.unpack("i", buf)[0]
+
+    # Run the target on 'data', the input 'input_id'. Its hits are left in the
+    # hit map.
+    def run(self, data, input_id):
+        if self.src == "stdin":
+            self.input_file.seek(0)
+            self.input_file.truncate()
+            self.input_file.write(data)
+            self.input_file.flush()
+            self.input_file.seek(0)
+        else:
+            f = open("@@", "wb")
+            f.write(data)
+            f.close()
+        self.hits.clear(input_id)
+        os.write(self.ctl_w, struct.pack("I", 0))
+        pid = self._read_int(TIMEOUT)
+        if pid is None:
+            raise ForkServerError("the forkserver does not respond")
+        if self._read_int(TIMEOUT) is None:
+            os.kill(pid, signal.SIGKILL)
+            self._read_int(None)
+
+    def close(self):
+        os.close(self.ctl_w)
+        os.close(self.st_r)
+        self.proc.kill()
+        self.proc.wait()
+        self.input_file.close()
+
+
+def main():
+    if len(sys.argv) != 5:
+        print("Usage: %s <target program> <cmdline> <source> <bug list>" % sys.argv[0])
+        exit(1)
+    targ, cmdline, src, bug_list = sys.argv[1:]
+    # The Nth bug of the list is counted in the counters 2 * N and 2 * N + 1
+    # (see LOGGER_MAP_SIZE in config.h of the Logger).
+    f = open(bug_list, "r")
+    bugs = f.read().split()
+    f.close()
+
+    if os.path.exists(VALUE_TRACE_FILE):
+        os.remove(VALUE_TRACE_FILE)
+    hits = HitMap()
+    try:
+        server = ForkServer(targ, cmdline, src, hits)
+    except ForkServerError as e:
+        print(e)
+        hits.close()
+        exit(1)
+    out = open(COVERAGE_FILE, "w")
+    columns = ["seed"]
+    for bug in bugs:
+        columns += ["%s:function" % bug, "%s:line" % bug]
+    out.write("\t".join(columns) + "\n")
+    for seed in sorted(os.listdir(QUEUE_DIR)):
+        path = os.path.join(QUEUE_DIR, seed)
+        if not os.path.isfile(path):
+            continue
+        f = open(path, "rb")
+        data = f.read()
+        f.close()
+        try:
+            server.run(data, int(seed[3:9]) if seed.startswith("id:") else 0)
+        except ForkServerError as e:
+            print("%s: %s, restarting it" % (seed, e))
+            server.close()
+            server = ForkServer(targ, cmdline, src, hits)
+        row = [seed] + ["%d" % (hits[i] > 0) for i in range(2 * len(bugs))]
+        out.write("\t".join(row) + "\n")
+    out.close()
+    server.close()
+    hits.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+import ctypes, ctypes.util
+
+# The hit counters of a Logger build, in a System V shared memory segment like
+# the trace bits of afl-fuzz. The target attaches the segment whose id is in
+# LOGGER_SHM_ENV_VAR, and the counters are read in place through a memoryview,
+# without copying them or parsing any output of the target.
+
+# Same as config.h of the Logger.
+LOGGER_SHM_ENV_VAR = "__LOGGER_SHM_ID"
+LOGGER_MAP_SIZE = 256
+LOGGER_INPUT_SLOT = LOGGER_MAP_SIZE - 1
+IPC_PRIVATE = 0
+IPC_CREAT = 0o1000
+IPC_EXCL = 0o2000
+IPC_RMID = 0
+
+libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+libc.shmat.restype = ctypes.c_void_p
+libc.shmat.argtypes = [ctypes.c_int, ctypes.c_void_p, ctypes.c_int]
+libc.shmdt.argtypes = [ctypes.c_void_p]
+libc.shmctl.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.c_void_p]
+
+
+class HitMap:
+    def __init__(self, size=LOGGER_MAP_SIZE):
+        self.size = size
+        self.shm_id = libc.shmget(IPC_PRIVATE, size * 4, IPC_CREAT | IPC_EXCL | 0o600)
+        if self.shm_id < 0:
+            raise OSError(ctypes.get_errno(), "shmget() failed")
+        self.addr = libc.shmat(self.shm_id, None, 0)
+        if self.addr == ctypes.c_void_p(-1).value:
+            libc.shmctl(self.shm_id, IPC_RMID, None)
+            raise OSError(ctypes.get_errno(), "shmat() failed")
+        self.counters = memoryview((ctypes.c_uint32 * size).from_address(self.addr)).cast("B").cast("I")
+
+    # Environment variables that make a Logger build count its hits here.
+    def env(self):
+        return {LOGGER_SHM_ENV_VAR: str(self.shm_id)}
+
+    # Reset the counters for the run of the input 'input_id', which tags the
+    # values the run records (see __logger_log_value() in afl-llvm-rt.o.c).
+    def clear(self, input_id=0):
+        ctypes.memset(self.addr, 0, self.size * 4)
+        self.counters[LOGGER_INPUT_SLOT] = input_id
+
+    def __getitem__(self, idx):
+        return self.counters[idx]
+
+    def close(self):
+        self.counters.release()
+        libc.shmdt(ctypes.c_void_p(self.addr))
+        libc.shmctl(self.shm_id, IPC_RMID, None)
@@ -0,0 +1,142 @@
+import sys, os, re
+
+# Merge the findings of parallel fuzzer instances that synced through one
+# output directory (output/<instance>/{queue,crashes,hangs}) into
+# output/{queue,crashes,hangs}, so that the post-processing and the parsers see
+# a single campaign. Entries are renumbered in the order they were found, and
+# 'src:' ids are translated so that the seed lineage is kept. Entries imported
+# from another instance ('sync:') are dropped in favor of the original one.
+
+MERGED_DIRS = ["queue", "crashes", "hangs"]
+INSTANCE_FILE = "instances.tsv"
+ID_RE = r'^id:(\d{6})'
+SYNC_RE = r'sync:([^,]+),src:(\d{6})'
+SRC_RE = r'src:([\d+]+)'
+
+
+def list_instances(outdir):
+    instances = []
+    for name in sorted(os.listdir(outdir)):
+        if name in MERGED_DIRS:
+            continue
+        if os.path.isdir(os.path.join(outdir, name, "queue")):
+            instances.append(name)
+    return instances
+
+
+def list_entries(outdir, instances, subdir):
+    entries = []
+    for inst in instances:
+        indir = os.path.join(outdir, inst, subdir)
+        if not os.path.isdir(indir):
+            continue
+        for name in os.listdir(indir):
+            if re.match(ID_RE, name) is None:
+                continue
+            path = os.path.join(indir, name)
+            entries.append((os.stat(path).st_mtime, inst, name, path))
+    entries.sort()
+    return entries
+
+
+# Returns ({(instance, old id): new id}, queue entries to keep). Every instance
+# starts from the same seeds, which are kept only once.
+def number_queue(entries):
+    id_map = {}
+    imported = {}
+    seeds = {}
+    kept = []
+    for entry in entries:
+        (_, inst, name, _) = entry
+        old_id = re.match(ID_RE, name).group(1)
+        m = re.search(SYNC_RE, name)
+        if m is not None:
+            imported[(inst, old_id)] = (m.group(1), m.group(2))
+            continue
+        seed_name = name[len("id:000000"):]
+        if ",orig:" in name and seed_name in seeds:
+            id_map[(inst, old_id)] = seeds[seed_name]
+            continue
+        id_map[(inst, old_id)] = "%06d" % len(kept)
+        if ",orig:" in name:
+            seeds[seed_name] = id_map[(inst, old_id)]
+        kept.append(entry)
+
+    # An imported entry may itself come from an import of another instance.
+    def resolve(key, depth):
+        if key in id_map:
+            return id_map[key]
+        if key not in imported or depth > len(imported):
+            return None
+        return resolve(imported[key], depth + 1)
+
+    for key in imported:
+        new_id = resolve(key, 0)
+        if new_id is not None:
+            id_map[key] = new_id
+    return (id_map, kept)
+
+
+def rename(name, inst, new_id, id_map):
+    def translate(m):
+        ids = [id_map.get((inst, x), x) for x in m.group(1).split("+")]
+        return "src:" + "+".join(ids)
+    name = re.sub(ID_RE, "id:" + new_id, name)
+    return re.sub(SRC_RE, translate, name, count=1)
+
+
+def link(src, dst):
+    try:
+        os.link(src, dst)
+    except OSError: # Copy, keeping the mtime that tells when it was found.
+        f = open(src, "rb")
+        data = f.read()
+        f.close()
+        f = open(dst, "wb")
+        f.write(data)
+        f.close()
+        st = os.stat(src)
+        os.utime(dst, (st.st_atime, st.st_mtime))
+
+
+def main():
+    if len(sys.argv) != 2:
+        print("Usage: %s <output directory>" % sys.argv[0])
+        exit(1)
+    outdir = sys.argv[1]
+    instances = list_instances(outdir)
+    if len(instances) == 0:
+        print("No fuzzer instance found under %s" % outdir)
+        exit(1)
+
+    id_map, queue = number_queue(list_entries(outdir, instances, "queue"))
+    log = open(os.path.join(outdir, INSTANCE_FILE), "w")
+    log.write("merged\tinstance\toriginal\n")
+    for subdir in MERGED_DIRS:
+        dst_dir = os.path.join(outdir, subdir)
+        os.makedirs(dst_dir, exist_ok=True)
+        if subdir == "queue":
+            entries = queue
+        else:
+            entries = list_entries(outdir, instances, subdir)
+        for (i, (_, inst, name, path)) in enumerate(entries):
+            if subdir == "queue":
+                new_id = id_map[(inst, re.match(ID_RE, name).group(1))]
+            else:
+                new_id = "%06d" % i
+            new_name = rename(name, inst, new_id, id_map)
+            link(path, os.path.join(dst_dir, new_name))
+            log.write("%s/%s\t%s\t%s\n" % (subdir, new_name, inst, name))
+    log.close()
+
+    # Keep the statistics of the main instance where a single instance has them.
+    for name in ["fuzzer_stats", "plot_data"]:
+        path = os.path.join(outdir, instances[0], name)
+        if "main" in instances:
+            path = os.path.join(outdir, "main", name)
+        if os.path.exists(path) and not os.path.exists(os.path.join(outdir, name)):
+            link(path, os.path.join(outdir, name))
+
+
+if __name__ == "__main__":
+    main()
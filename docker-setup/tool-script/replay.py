@@ -0,0 +1,101 @@
+import sys, os, shutil, queue, collections, subprocess
+from concurrent.futures import ThreadPoolExecutor
+from symbolize import find_symbolizer, Symbolizer, symbolize_report
+
+# Replay the crashes in output/crashes with the ASAN build of the target, one
+# replay per core, and write output/replay_log.txt in the format the parsers
+# expect: a 'Replaying crash - <name> (found at <sec> sec.):' header per crash,
+# followed by the stderr of the replay (and its exit value for file inputs).
+# Crashes are logged in the order of their names, as the shell loop did. When
+# llvm-symbolizer is available, the replays do not symbolize their reports;
+# each report is symbolized by one llvm-symbolizer process (see symbolize.py)
+# and written out as soon as the replays before it are logged. Only a few
+# reports per worker are held in memory.
+
+CRASH_DIR = "output/crashes"
+REPLAY_LOG = "output/replay_log.txt"
+SCRATCH_DIR = "/box/replay"
+TIMEOUT = ["timeout", "-k", "30", "15"]
+# Replays started ahead of the one being logged, per worker.
+REPLAY_AHEAD = 2
+
+
+# Run 'binary' on the crashing input at 'path' in 'workdir', where the '@@' of
+# the command line is. Returns the stderr of the run.
+def replay_crash(binary, cmdline, src, path, workdir):
+    cmd = TIMEOUT + [binary] + cmdline.split()
+    if src == "stdin":
+        f = open(path, "rb")
+        p = subprocess.run(cmd, cwd=workdir, stdin=f, stdout=subprocess.DEVNULL,
+                           stderr=subprocess.PIPE)
+        f.close()
+        return p.stderr.decode("latin-1")
+    shutil.copyfile(path, os.path.join(workdir, "@@"))
+    p = subprocess.run(cmd, cwd=workdir, stdin=subprocess.DEVNULL,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    return p.stderr.decode("latin-1") + "Exit value is %d\n" % p.returncode
+
+
+def main():
+    if len(sys.argv) != 5:
+        print("Usage: %s <target program> <cmdline> <source> <start time>" % sys.argv[0])
+        exit(1)
+    targ, cmdline, src, start_time = sys.argv[1:]
+    start_time = int(start_time)
+    if src not in ["stdin", "file"]:
+        print("Invalid input source: %s" % src)
+        exit(1)
+
+    binary = os.path.abspath(targ)
+    symbolizer_path = find_symbolizer()
+    if symbolizer_path is not None:
+        os.environ["ASAN_OPTIONS"] = os.environ.get("ASAN_OPTIONS", "") + ",symbolize=0"
+    crashes = sorted(os.listdir(CRASH_DIR)) if os.path.isdir(CRASH_DIR) else []
+    worker_num = len(os.sched_getaffinity(0))
+    # Each worker gets its own directory, so that their '@@' do not clash.
+    workdirs = queue.Queue()
+    for i in range(worker_num):
+        workdir = os.path.join(SCRATCH_DIR, str(i))
+        os.makedirs(workdir, exist_ok=True)
+        workdirs.put(workdir)
+
+    def replay_one(crash):
+        path = os.path.join(CRASH_DIR, crash)
+        found_time = int(os.stat(path).st_mtime) - start_time
+        workdir = workdirs.get()
+        try:
+            stderr = replay_crash(binary, cmdline, src, path, workdir)
+        finally:
+            workdirs.put(workdir)
+        return "\nReplaying crash - %s (found at %d sec.):\n%s" % (crash, found_time, stderr)
+
+    symbolizer = None
+    if symbolizer_path is not None:
+        symbolizer = Symbolizer(symbolizer_path)
+    # The reports were decoded as latin-1, so they are written back byte for byte.
+    f = open(REPLAY_LOG, "w", encoding="latin-1")
+    f.write("Crash Replay log for %s\n" % targ)
+
+    def write_replay(future):
+        replay_buf = future.result()
+        if symbolizer is not None:
+            replay_buf = symbolize_report(replay_buf, symbolizer)
+        f.write(replay_buf)
+
+    executor = ThreadPoolExecutor(worker_num)
+    futures = collections.deque()
+    for crash in crashes:
+        futures.append(executor.submit(replay_one, crash))
+        if len(futures) >= REPLAY_AHEAD * worker_num:
+            write_replay(futures.popleft())
+    while len(futures) > 0:
+        write_replay(futures.popleft())
+    executor.shutdown()
+    f.close()
+    if symbolizer is not None:
+        symbolizer.close()
+    shutil.rmtree(SCRATCH_DIR, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
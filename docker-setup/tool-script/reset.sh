@@ -0,0 +1,9 @@
+#!/bin/bash
+
+# Bring a warm container back to the state right after staging, so that it can
+# take the next work item of the same target.
+read FUZZER_NAME TARGET < /box/.staged
+cd /box
+rm -rf output resume @@ log logger_in early-stop /STATUS /output
+# The post-processing replaces the target with its ASAN and Logger builds.
+cp -f /benchmark/bin/$FUZZER_NAME/$TARGET ./$TARGET
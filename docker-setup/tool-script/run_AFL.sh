@@ -3,7 +3,7 @@
 FUZZER_NAME='AFL'
 . $(dirname $0)/common-setup.sh
 
-timeout $4 /fuzzer/AFL/afl-fuzz \
-  $DICT_OPT -m none -d -i seed -o output $5 -- ./$1 $2
+run_fuzzer /fuzzer/AFL/afl-fuzz \
+  $DICT_OPT -m none -d -i seed $5
 
 . $(dirname $0)/common-postproc.sh
@@ -3,7 +3,7 @@
 FUZZER_NAME='DAFL-naive'
 . $(dirname $0)/common-setup.sh
 
-timeout $4 /fuzzer/DAFL/afl-fuzz \
-  $DICT_OPT -m none -d -i seed -o output $5 -- ./$1 $2
+run_fuzzer /fuzzer/DAFL/afl-fuzz \
+  $DICT_OPT -m none -d -i seed $5
 
 . $(dirname $0)/common-postproc.sh
@@ -8,7 +8,7 @@ cp /benchmark/bin/WindRanger/$1-distance.txt ./distance.txt
 cp /benchmark/bin/WindRanger/$1-targets.txt ./targets.txt
 cp /benchmark/bin/WindRanger/$1-condition_info.txt ./condition_info.txt
   
-timeout $4 /fuzzer/WindRanger/fuzz/afl-fuzz \
-  $DICT_OPT -m none -d -i seed -o output $5 -- ./$1 $2
+run_fuzzer /fuzzer/WindRanger/fuzz/afl-fuzz \
+  $DICT_OPT -m none -d -i seed $5
 
 . $(dirname $0)/common-postproc.sh
@@ -0,0 +1,183 @@
+import os, re, json, fcntl, struct, shutil, hashlib, tempfile, subprocess
+
+# Offline symbolization of ASAN reports. The replays run with symbolize=0, so
+# their frames only have a module and an offset, like
+#     #1 0x4f5e3a  (/box/cxxfilt+0x4f5e3a)
+# Their frames are then resolved by one llvm-symbolizer process, and the
+# reports are rewritten the way ASAN prints them when it symbolizes online, so
+# that the checks in triage.py match them as before. Resolved frames are cached
+# on disk per build ID of the module, in a host directory that the containers
+# of every experiment share (see run_experiment.py).
+
+CACHE_DIR = "/symbol-cache"
+FRAME_RE = r'^(\s*)#(\d+) (0x[0-9a-f]+)  \((.+)\+(0x[0-9a-f]+)\)( \(BuildId: [0-9a-f]+\))?$'
+SUMMARY_RE = r'^(SUMMARY: \S+: \S+) \((.+)\+(0x[0-9a-f]+)\) ?$'
+NT_GNU_BUILD_ID = 3
+SHT_NOTE = 7
+
+
+def find_symbolizer():
+    path = os.environ.get("ASAN_SYMBOLIZER_PATH", "")
+    if path != "" and os.path.exists(path):
+        return path
+    return shutil.which("llvm-symbolizer")
+
+
+# The GNU build ID of an ELF file, or the hash of its contents if it has none.
+def read_build_id(path):
+    f = open(path, "rb")
+    buf = f.read()
+    f.close()
+    if buf[:4] == b"\x7fELF":
+        is_64 = buf[4] == 2
+        endian = "<" if buf[5] == 1 else ">"
+        if is_64:
+            shoff, = struct.unpack_from(endian + "Q", buf, 0x28)
+            shentsize, shnum = struct.unpack_from(endian + "HH", buf, 0x3a)
+        else:
+            shoff, = struct.unpack_from(endian + "I", buf, 0x20)
+            shentsize, shnum = struct.unpack_from(endian + "HH", buf, 0x2e)
+        for i in range(shnum):
+            sh = shoff + i * shentsize
+            sh_type, = struct.unpack_from(endian + "I", buf, sh + 4)
+            if sh_type != SHT_NOTE:
+                continue
+            if is_64:
+                offset, size = struct.unpack_from(endian + "QQ", buf, sh + 0x18)
+            else:
+                offset, size = struct.unpack_from(endian + "II", buf, sh + 0x10)
+            pos = offset
+            while pos + 12 <= offset + size:
+                namesz, descsz, note_type = struct.unpack_from(endian + "III", buf, pos)
+                name_end = pos + 12 + (namesz + 3) // 4 * 4
+                if note_type == NT_GNU_BUILD_ID and buf[pos + 12:pos + 15] == b"GNU":
+                    return buf[name_end:name_end + descsz].hex()
+                pos = name_end + (descsz + 3) // 4 * 4
+    return hashlib.sha1(buf).hexdigest()
+
+
+# A long-lived llvm-symbolizer process, with the frames it resolved cached per
+# build ID. Each (module, offset) is resolved to a list of (function, file,
+# line, column), longer than one when functions were inlined.
+class Symbolizer:
+    def __init__(self, symbolizer_path, cache_dir=CACHE_DIR):
+        self.cache_dir = cache_dir
+        self.build_ids = {}
+        self.caches = {}
+        self.dirty = set()
+        self.proc = subprocess.Popen([symbolizer_path, "--inlining", "--demangle"],
+                                     stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                     stderr=subprocess.DEVNULL, universal_newlines=True,
+                                     encoding="latin-1")
+
+    def _cache(self, module):
+        if module not in self.build_ids:
+            self.build_ids[module] = read_build_id(module) if os.path.exists(module) else None
+        build_id = self.build_ids[module]
+        if build_id is None:
+            return None
+        if build_id not in self.caches:
+            self.caches[build_id] = {}
+            path = os.path.join(self.cache_dir, build_id + ".json")
+            if os.path.exists(path):
+                f = open(path, "r")
+                self.caches[build_id] = json.load(f)
+                f.close()
+        return self.caches[build_id]
+
+    def _query(self, module, offset):
+        self.proc.stdin.write("CODE \"%s\" %s\n" % (module, offset))
+        self.proc.stdin.flush()
+        frames = []
+        lines = []
+        while True:
+            line = self.proc.stdout.readline()
+            if line == "" or line == "\n":
+                break
+            lines.append(line.rstrip("\n"))
+        for i in range(0, len(lines) - 1, 2):
+            func = lines[i]
+            file_name, line_num, col = (lines[i + 1].rsplit(":", 2) + ["0", "0"])[:3]
+            frames.append((func, file_name, int(line_num), int(col)))
+        return frames
+
+    def lookup(self, module, offset):
+        cache = self._cache(module)
+        if cache is None:
+            return []
+        if offset not in cache:
+            cache[offset] = self._query(module, offset)
+            self.dirty.add(self.build_ids[module])
+        return cache[offset]
+
+    # Other containers may have extended the cache of a build ID meanwhile, so
+    # their frames are merged before the cache is replaced, under an exclusive
+    # lock of the build ID.
+    def close(self):
+        self.proc.stdin.close()
+        self.proc.wait()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        for build_id in self.dirty:
+            path = os.path.join(self.cache_dir, build_id + ".json")
+            lock = open(path + ".lock", "a")
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                cache = {}
+                if os.path.exists(path):
+                    f = open(path, "r")
+                    cache = json.load(f)
+                    f.close()
+                cache.update(self.caches[build_id])
+                fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+                f = os.fdopen(fd, "w")
+                json.dump(cache, f)
+                f.close()
+                os.rename(tmp_path, path)
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+                lock.close()
+
+
+# Same as the '%L' of ASAN's stack_trace_format.
+def format_location(file_name, line_num, col, module, offset):
+    if file_name == "??" or file_name == "":
+        return "(%s+%s)" % (module, offset)
+    loc = file_name
+    if line_num > 0:
+        loc += ":%d" % line_num
+        if col > 0:
+            loc += ":%d" % col
+    return loc
+
+
+# Rewrite the unsymbolized frames and summary of 'buf'. Inlined functions make
+# a frame expand to several ones, so the frames that follow are renumbered, as
+# ASAN does.
+def symbolize_report(buf, symbolizer):
+    out_lines = []
+    shift = 0
+    for line in buf.split("\n"):
+        m = re.match(FRAME_RE, line)
+        if m is not None:
+            indent, num, pc, module, offset, _ = m.groups()
+            if num == "0":
+                shift = 0
+            frames = [x for x in symbolizer.lookup(module, offset) if x[0] != "??"]
+            if len(frames) == 0:
+                out_lines.append("%s#%d %s  (%s+%s)" % (indent, int(num) + shift, pc, module, offset))
+                continue
+            for (i, (func, file_name, line_num, col)) in enumerate(frames):
+                loc = format_location(file_name, line_num, col, module, offset)
+                out_lines.append("%s#%d %s in %s %s" % (indent, int(num) + shift + i, pc, func, loc))
+            shift += len(frames) - 1
+            continue
+        m = re.match(SUMMARY_RE, line)
+        if m is not None:
+            prefix, module, offset = m.groups()
+            frames = [x for x in symbolizer.lookup(module, offset) if x[0] != "??"]
+            if len(frames) > 0:
+                func, file_name, line_num, col = frames[0]
+                loc = format_location(file_name, line_num, col, module, offset)
+                line = "%s %s in %s" % (prefix, loc, func)
+        out_lines.append(line)
+    return "\n".join(out_lines)
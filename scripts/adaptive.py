@@ -0,0 +1,70 @@
+import os
+from math import comb
+from parse_result import parse_tte
+
+# Minimum number of iterations of a (tool, target) pair before it may stop.
+MIN_ITERATION = 10
+# Confidence level of the interval around the median TTE.
+CONFIDENCE = 0.95
+# The median has converged when its confidence interval is narrower than this
+# fraction of the median, or of the time limit for very short TTEs.
+MAX_REL_WIDTH = 0.25
+MIN_ABS_WIDTH = 0.02
+
+
+# Indices (0-based) of the order statistics that bound a distribution-free
+# confidence interval of the median of 'n' samples, or None if 'n' is too small.
+def median_ci_bounds(n, confidence=CONFIDENCE):
+    alpha = (1 - confidence) / 2
+    cdf = 0
+    lower = None
+    for k in range(n + 1):
+        cdf += comb(n, k) / 2 ** n
+        if cdf > alpha:
+            break
+        lower = k
+    if lower is None:
+        return None
+    return (lower, n - 1 - lower)
+
+
+# Decides, as iterations finish, which (tool, target) pairs need more of them.
+# TTEs are taken from the replay log like parse_result.py does, and timeouts
+# count as the time limit, like replace_none() in parse_result.py.
+class IterationController:
+    def __init__(self, timelimit, min_iteration=MIN_ITERATION):
+        self.timelimit = timelimit
+        self.min_iteration = min_iteration
+        self.results = {}
+        self.done = set()
+
+    def record(self, job, targ_dir):
+        key = (job["tool"], job["work"][0])
+        tte = None
+        if os.path.exists(os.path.join(targ_dir, "replay_log.txt")):
+            tte = parse_tte(job["work"][0], targ_dir)
+        if tte is None or tte > self.timelimit:
+            tte = self.timelimit
+        self.results.setdefault(key, []).append(tte)
+        if key not in self.done and self.has_converged(self.results[key]):
+            ttes = sorted(self.results[key])
+            print("%s on %s converged after %d iterations (median %d sec.)"
+                  % (key[0], key[1], len(ttes), ttes[len(ttes) // 2]))
+            self.done.add(key)
+
+    def has_converged(self, ttes):
+        n = len(ttes)
+        if n < self.min_iteration:
+            return False
+        bounds = median_ci_bounds(n)
+        if bounds is None:
+            return False
+        ttes = sorted(ttes)
+        low, high = ttes[bounds[0]], ttes[bounds[1]]
+        if low >= self.timelimit: # Times out more than half of the time.
+            return True
+        median = ttes[n // 2]
+        return high - low <= max(MAX_REL_WIDTH * median, MIN_ABS_WIDTH * self.timelimit)
+
+    def needs(self, job):
+        return (job["tool"], job["work"][0]) not in self.done
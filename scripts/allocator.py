@@ -0,0 +1,176 @@
+import os, glob, json, fcntl
+from common import run_cmd
+
+SYS_CPU_DIR = "/sys/devices/system/cpu"
+SYS_NODE_DIR = "/sys/devices/system/node"
+# Shared by every run_experiment.py invocation on this host.
+LEASE_FILE = "/tmp/genevis-leases.json"
+# Fraction of each NUMA node's memory that may be leased to containers.
+MEM_LEASE_RATIO = 0.9
+
+
+def read_file(filename):
+    f = open(filename, "r")
+    buf = f.read().strip()
+    f.close()
+    return buf
+
+
+# Parse the kernel's CPU list format (e.g. "0-3,8,10-11").
+def parse_cpu_list(cpu_list):
+    cpus = []
+    for tok in cpu_list.split(","):
+        if tok == "":
+            continue
+        if "-" in tok:
+            start, end = tok.split("-")
+            cpus += list(range(int(start), int(end) + 1))
+        else:
+            cpus.append(int(tok))
+    return cpus
+
+
+def read_node_mem(node_dir):
+    for line in read_file(os.path.join(node_dir, "meminfo")).splitlines():
+        if "MemTotal:" in line:
+            return int(line.split()[-2]) * 1024
+    return 0
+
+
+def read_total_mem():
+    for line in read_file("/proc/meminfo").splitlines():
+        if line.startswith("MemTotal:"):
+            return int(line.split()[1]) * 1024
+    return 0
+
+
+# Returns (cores, node_mem). Each core is a (node, [logical CPUs]) pair, where
+# the logical CPUs are the SMT siblings of one physical core. 'node_mem' maps
+# each NUMA node to its total memory in bytes.
+def read_topology():
+    online = os.path.join(SYS_CPU_DIR, "online")
+    if os.path.exists(online):
+        cpus = parse_cpu_list(read_file(online))
+    else:
+        cpus = list(range(os.cpu_count()))
+
+    cpu_node = {}
+    node_mem = {}
+    for node_dir in glob.glob(os.path.join(SYS_NODE_DIR, "node[0-9]*")):
+        node = int(os.path.basename(node_dir)[len("node"):])
+        for cpu in parse_cpu_list(read_file(os.path.join(node_dir, "cpulist"))):
+            cpu_node[cpu] = node
+        node_mem[node] = read_node_mem(node_dir)
+    if len(node_mem) == 0:
+        node_mem[0] = read_total_mem()
+
+    cores = []
+    seen = set()
+    for cpu in cpus:
+        if cpu in seen:
+            continue
+        siblings_file = os.path.join(SYS_CPU_DIR, "cpu%d" % cpu, "topology",
+                                     "thread_siblings_list")
+        if os.path.exists(siblings_file):
+            siblings = parse_cpu_list(read_file(siblings_file))
+            siblings = [x for x in siblings if x in cpus]
+        else:
+            siblings = [cpu]
+        seen.update(siblings)
+        cores.append((cpu_node.get(cpu, 0), siblings))
+    return (cores, node_mem)
+
+
+def is_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def is_container_running(name):
+    output = run_cmd("docker inspect -f {{.State.Running}} %s" % name)
+    return output.strip() == b"true"
+
+
+# Leases whole physical cores (all of their SMT siblings) and node-local memory
+# to containers. Leases are kept in LEASE_FILE under an exclusive lock, so that
+# several experiments can share a host. A lease is named after its container,
+# and is reclaimed once its owner process is gone and its container no longer
+# runs: the containers of a dead process keep using their cores until --resume
+# takes them back.
+class CoreAllocator:
+    def __init__(self, lease_file=LEASE_FILE, topology=None, is_running=is_container_running):
+        self.lease_file = lease_file
+        self.is_running = is_running
+        if topology is None:
+            topology = read_topology()
+        self.cores, node_mem = topology
+        self.node_budget = {}
+        for (node, mem) in node_mem.items():
+            self.node_budget[node] = int(mem * MEM_LEASE_RATIO)
+
+    def _update(self, func):
+        f = open(self.lease_file, "a+")
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            f.seek(0)
+            buf = f.read()
+            leases = json.loads(buf) if buf.strip() != "" else {}
+            for name in list(leases.keys()):
+                if not is_alive(leases[name]["pid"]) and not self.is_running(name):
+                    del leases[name]
+            ret = func(leases)
+            f.seek(0)
+            f.truncate()
+            json.dump(leases, f, indent=1)
+            f.flush()
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+            f.close()
+        return ret
+
+    # Returns a lease dict, or None if no node has enough free cores and memory.
+    def acquire(self, name, core_num, memory):
+        def acquire_lease(leases):
+            used_cpus = set()
+            used_mem = {}
+            for lease in leases.values():
+                used_cpus.update(lease["cpus"])
+                used_mem[lease["node"]] = used_mem.get(lease["node"], 0) + lease["memory"]
+            free_cores = {}
+            for (node, cpus) in self.cores:
+                if used_cpus.isdisjoint(cpus):
+                    free_cores.setdefault(node, []).append(cpus)
+            # Prefer the node with the most free cores to spread the load.
+            nodes = sorted(free_cores.keys(), key=lambda n: -len(free_cores[n]))
+            for node in nodes:
+                if len(free_cores[node]) < core_num:
+                    continue
+                if used_mem.get(node, 0) + memory > self.node_budget.get(node, 0):
+                    continue
+                cpus = sum(free_cores[node][:core_num], [])
+                leases[name] = {
+                    "pid": os.getpid(), "cpus": cpus, "node": node, "memory": memory,
+                }
+                return leases[name]
+            return None
+        return self._update(acquire_lease)
+
+    # Take over the lease of a container started by a previous process.
+    def claim(self, name, lease):
+        lease = dict(lease)
+        lease["pid"] = os.getpid()
+        def claim_lease(leases):
+            leases[name] = lease
+        self._update(claim_lease)
+
+    def release(self, name):
+        return self._update(lambda leases: leases.pop(name, None))
+
+
+def cpuset_str(lease):
+    return ",".join([str(cpu) for cpu in lease["cpus"]])
@@ -1,61 +1,63 @@
 from triage import *
 
-# (target bin, target cmdline, input src, additional option, triage function)
+# (target bin, target cmdline, input src, triage rule in TRIAGE_RULES)
 
 FUZZ_TARGETS = [
-    ("swftophp-4.7-2016-9827", "@@", "file", check_swftophp_2016_9827),
-    ("swftophp-4.7-2016-9829", "@@", "file", check_swftophp_2016_9829),
-    ("swftophp-4.7-2016-9831", "@@", "file", check_swftophp_2016_9831),
-    ("swftophp-4.7-2017-9988", "@@", "file", check_swftophp_2017_9988),
-    ("swftophp-4.7-2017-11728", "@@", "file", check_swftophp_2017_11728),
-    ("swftophp-4.7-2017-11729", "@@", "file", check_swftophp_2017_11729),
-    ("swftophp-4.7.1-2017-7578", "@@", "file", check_swftophp_2017_7578),
-    ("swftophp-4.8-2018-7868", "@@", "file", check_swftophp_2018_7868),
-    ("swftophp-4.8-2018-8807", "@@", "file", check_swftophp_2018_8807),
-    ("swftophp-4.8-2018-8962", "@@", "file", check_swftophp_2018_8962),
-    ("swftophp-4.8-2018-11095", "@@", "file", check_swftophp_2018_11095),
-    ("swftophp-4.8-2018-11225", "@@", "file", check_swftophp_2018_11225),
-    ("swftophp-4.8-2018-11226", "@@", "file", check_swftophp_2018_11226),
-    ("swftophp-4.8-2018-20427", "@@", "file", check_swftophp_2018_20427),
-    ("swftophp-4.8.1-2019-9114", "@@", "file", check_swftophp_2019_9114),
-    ("swftophp-4.8-2019-12982", "@@", "file", check_swftophp_2019_12982),
-    ("swftophp-4.8-2020-6628", "@@", "file", check_swftophp_2020_6628),
-    ("lrzip-9de7ccb-2017-8846", "-m 10 -t @@", "file", check_lrzip_2017_8846),
-    ("lrzip-ed51e14-2018-11496", "-t @@", "file", check_lrzip_2018_11496),
-    ("cxxfilt-2016-4487", "", "stdin", check_cxxfilt_2016_4487),
-    ("cxxfilt-2016-4489", "", "stdin", check_cxxfilt_2016_4489),
-    ("cxxfilt-2016-4490", "", "stdin", check_cxxfilt_2016_4490),
-    ("cxxfilt-2016-4491", "", "stdin", check_cxxfilt_2016_4491),
-    ("cxxfilt-2016-4492", "", "stdin", check_cxxfilt_2016_4492),
-    ("cxxfilt-2016-6131", "", "stdin", check_cxxfilt_2016_6131),
+    ("swftophp-4.7-2016-9827", "@@", "file", "swftophp-2016-9827"),
+    ("swftophp-4.7-2016-9829", "@@", "file", "swftophp-2016-9829"),
+    ("swftophp-4.7-2016-9831", "@@", "file", "swftophp-2016-9831"),
+    ("swftophp-4.7-2017-9988", "@@", "file", "swftophp-2017-9988"),
+    ("swftophp-4.7-2017-11728", "@@", "file", "swftophp-2017-11728"),
+    ("swftophp-4.7-2017-11729", "@@", "file", "swftophp-2017-11729"),
+    ("swftophp-4.7.1-2017-7578", "@@", "file", "swftophp-2017-7578"),
+    ("swftophp-4.8-2018-7868", "@@", "file", "swftophp-2018-7868"),
+    ("swftophp-4.8-2018-8807", "@@", "file", "swftophp-2018-8807"),
+    ("swftophp-4.8-2018-8962", "@@", "file", "swftophp-2018-8962"),
+    ("swftophp-4.8-2018-11095", "@@", "file", "swftophp-2018-11095"),
+    ("swftophp-4.8-2018-11225", "@@", "file", "swftophp-2018-11225"),
+    ("swftophp-4.8-2018-11226", "@@", "file", "swftophp-2018-11226"),
+    ("swftophp-4.8-2018-20427", "@@", "file", "swftophp-2018-20427"),
+    ("swftophp-4.8.1-2019-9114", "@@", "file", "swftophp-2019-9114"),
+    ("swftophp-4.8-2019-12982", "@@", "file", "swftophp-2019-12982"),
+    ("swftophp-4.8-2020-6628", "@@", "file", "swftophp-2020-6628"),
+    ("lrzip-9de7ccb-2017-8846", "-m 10 -t @@", "file", "lrzip-2017-8846"),
+    ("lrzip-ed51e14-2018-11496", "-t @@", "file", "lrzip-2018-11496"),
+    ("cxxfilt-2016-4487", "", "stdin", "cxxfilt-2016-4487"),
+    ("cxxfilt-2016-4489", "", "stdin", "cxxfilt-2016-4489"),
+    ("cxxfilt-2016-4490", "", "stdin", "cxxfilt-2016-4490"),
+    ("cxxfilt-2016-4491", "", "stdin", "cxxfilt-2016-4491"),
+    ("cxxfilt-2016-4492", "", "stdin", "cxxfilt-2016-4492"),
+    ("cxxfilt-2016-6131", "", "stdin", "cxxfilt-2016-6131"),
     ("objcopy-2017-8393", "--compress-debug-sections @@ out", "file", \
-        check_objcopy_2017_8393),
+        "objcopy-2017-8393"),
     ("objcopy-2017-8394", "-Gs @@ out", "file",  \
-        check_objcopy_2017_8394),
+        "objcopy-2017-8394"),
     ("objcopy-2017-8395", "--compress-debug-sections @@ out", "file", \
-        check_objcopy_2017_8395),
-    ("objdump-2017-8392", "-SD @@", "file", check_objdump_2017_8392),
-    ("objdump-2017-8396", "-W @@", "file", check_objdump_2017_8396),
-    ("objdump-2017-8397", "-W @@", "file", check_objdump_2017_8397),
-    ("objdump-2017-8398", "-W @@", "file", check_objdump_2017_8398),
+        "objcopy-2017-8395"),
+    ("objdump-2017-8392", "-SD @@", "file", "objdump-2017-8392"),
+    ("objdump-2017-8396", "-W @@", "file", "objdump-2017-8396"),
+    ("objdump-2017-8397", "-W @@", "file", "objdump-2017-8397"),
+    ("objdump-2017-8398", "-W @@", "file", "objdump-2017-8398"),
     ("objdump-2.31.1-2018-17360", "--dwarf-check -C -g -f -dwarf -x @@", "file", \
-        check_objdump_2018_17360),
-    ("strip-2017-7303", "-o /dev/null @@", "file", check_strip_2017_7303),
+        "objdump-2018-17360"),
+    ("strip-2017-7303", "-o /dev/null @@", "file", "strip-2017-7303"),
     ("nm-2017-14940", "-A -a -l -S -s --special-syms --synthetic --with-symbol-versions -D @@", \
-        "file", check_nm_2017_14940),
-    ("readelf-2017-16828", "-w @@", "file", check_readelf_2017_16828),
-    # ("xmllint-2017-5969", "--recover @@", "file", check_xmllint_2017_5969),
-    # ("xmllint-2017-9047", "--valid @@", "file", check_xmllint_2017_9047),
-    # ("xmllint-2017-9048", "--valid @@", "file", check_xmllint_2017_9048),
+        "file", "nm-2017-14940"),
+    ("readelf-2017-16828", "-w @@", "file", "readelf-2017-16828"),
+    # ("xmllint-2017-5969", "--recover @@", "file", "xmllint-2017-5969"),
+    # ("xmllint-2017-9047", "--valid @@", "file", "xmllint-2017-9047"),
+    # ("xmllint-2017-9048", "--valid @@", "file", "xmllint-2017-9048"),
     ("cjpeg-1.5.90-2018-14498", "-outfile /dev/null @@", "file", \
-    check_cjpeg_2018_14498),
+    "cjpeg-2018-14498"),
     ("cjpeg-2.0.4-2020-13790", "-outfile /dev/null @@", "file", \
-        check_cjpeg_2020_13790),
-    # ("lrzip-9de7ccb-2017-8846", "-t @@", "file", check_lrzip_2017_8846),
-    # ("xmllint-2017-9049", "--memory --oldxml10 @@", "file", check_xmllint_2017_9049),
-    # ("pngimage-2018-13785", "@@", "file", check_pngimage_2018_13785),
+        "cjpeg-2020-13790"),
+    # ("lrzip-9de7ccb-2017-8846", "-t @@", "file", "lrzip-2017-8846"),
+    # ("xmllint-2017-9049", "--memory --oldxml10 @@", "file", "xmllint-2017-9049"),
+    # ("pngimage-2018-13785", "@@", "file", "pngimage-2018-13785"),
 ]
 
+TARGET_RULES = dict([(x[0], x[3]) for x in FUZZ_TARGETS])
+
 
 SLICE_TARGETS = {
     'swftophp-4.7': {
@@ -144,9 +146,11 @@ SLICE_TARGETS = {
 }
 
 
-def generate_fuzzing_worklist(iteration):
+def generate_fuzzing_worklist(iteration, targets=None):
     worklist = []
     for (targ_prog, cmdline, src, _) in FUZZ_TARGETS:
+        if targets is not None and targ_prog not in targets:
+            continue
         if src not in ["stdin", "file"]:
             print("Invalid input source specified: %s" % src)
             exit(1)
@@ -178,8 +182,7 @@ def generate_slicing_worklist(benchmark):
 
 
 def check_targeted_crash(targ, replay_buf):
-    for (targ_prog, _, _, crash_checker) in FUZZ_TARGETS:
-        if targ_prog == targ:
-            return crash_checker(replay_buf)
-    print("Unknown target: %s" % targ)
-    exit(1)
+    if targ not in TARGET_RULES:
+        print("Unknown target: %s" % targ)
+        exit(1)
+    return check_rule(TARGET_RULES[targ], parse_report(replay_buf))
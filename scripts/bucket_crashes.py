@@ -0,0 +1,103 @@
+import os, hashlib, argparse
+from parse_result import get_experiment_info, iter_replay_log, REPLAY_LOG_FILE
+from triage import parse_report, match_rules
+
+# Deduplicate every replayed crash of the given experiments, not only the
+# targeted one. Crashes are bucketed by a stack signature, the bug class, the
+# crash point and the functions of the top frames of the crashing stack, and
+# each bucket reports how many crashes of each tool fell into it, and when each
+# tool first found it. Only the buckets are kept in memory, so the number of
+# crashes does not matter.
+
+DEFAULT_DEPTH = 3
+# Frames of the sanitizer runtime, which tell nothing about the bug.
+IGNORED_FRAME_PREFIXES = ["__asan_", "__interceptor_", "__sanitizer_", "__libc_start"]
+
+
+# The signature of a crash, and its human-readable form.
+def stack_signature(rec, depth):
+    funcs = []
+    for (func, file_name, line_num) in rec.frames:
+        if len(funcs) == depth:
+            break
+        if any([func.startswith(x) for x in IGNORED_FRAME_PREFIXES]):
+            continue
+        func = func if func != "" else "??"
+        # Keep the line of the crash point, so that different bugs in a
+        # function are told apart.
+        if len(funcs) == 0 and file_name != "":
+            func += " (%s:%d)" % (file_name, line_num)
+        funcs.append(func)
+    desc = "%s in %s" % (rec.bug_class or "no-report", " < ".join(funcs))
+    return (hashlib.sha1(desc.encode()).digest()[:8], desc)
+
+
+# Returns {(target, signature): bucket}, where a bucket has the description of
+# the signature, the bugs its first crash matched, and per tool the number of
+# crashes and the earliest found time (None if no crash had one).
+def bucket_crashes(outdirs, depth):
+    buckets = {}
+    for outdir in outdirs:
+        tool = os.path.basename(os.path.normpath(outdir))
+        targ_list, iter_cnt = get_experiment_info(outdir)
+        for targ in targ_list:
+            for iter_id in range(iter_cnt):
+                log_file = os.path.join(outdir, "%s-iter-%d" % (targ, iter_id), REPLAY_LOG_FILE)
+                # With --adaptive, converged targets have fewer iterations.
+                if not os.path.exists(log_file):
+                    continue
+                for item in iter_replay_log(log_file):
+                    found_time = item.found_time
+                    rec = parse_report(item.text())
+                    sig, desc = stack_signature(rec, depth)
+                    key = (targ, sig)
+                    if key not in buckets:
+                        buckets[key] = {"desc": desc, "bugs": match_rules(rec), "tools": {}}
+                    tools = buckets[key]["tools"]
+                    if tool not in tools:
+                        tools[tool] = [0, None]
+                    tools[tool][0] += 1
+                    # An item without a 'found at' header has no found time.
+                    if found_time is None:
+                        continue
+                    if tools[tool][1] is None or found_time < tools[tool][1]:
+                        tools[tool][1] = found_time
+    return buckets
+
+
+def print_buckets(buckets, tools):
+    targ_list = sorted(set([targ for (targ, _) in buckets]))
+    for targ in targ_list:
+        targ_buckets = [x for (key, x) in buckets.items() if key[0] == targ]
+        targ_buckets.sort(key=lambda x: -sum([y[0] for y in x["tools"].values()]))
+        print("(Crash buckets of %s)" % targ)
+        for bucket in targ_buckets:
+            bugs = " [%s]" % ", ".join(bucket["bugs"]) if len(bucket["bugs"]) > 0 else ""
+            print("%s%s" % (bucket["desc"], bugs))
+            for tool in tools:
+                if tool in bucket["tools"]:
+                    count, first_found = bucket["tools"][tool]
+                    if first_found is None:
+                        print("    %s: %d crashes, found time unknown" % (tool, count))
+                    else:
+                        print("    %s: %d crashes, first found at %d sec." % (tool, count, first_found))
+        print("------------------------------------------------------------------")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("outdirs", nargs="+", metavar="OUTDIR",
+                        help="Output directory of each tool")
+    parser.add_argument("--depth", type=int, default=DEFAULT_DEPTH,
+                        help="Number of top frames in the stack signature")
+    args = parser.parse_args()
+    for outdir in args.outdirs:
+        if not os.path.isdir(outdir):
+            print("Invalid output directory: %s" % outdir)
+            exit(1)
+    tools = [os.path.basename(os.path.normpath(x)) for x in args.outdirs]
+    print_buckets(bucket_crashes(args.outdirs, args.depth), tools)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,8 @@ import subprocess
 
 # TODO: Move to a separate file for configuration.
 MAX_INSTANCE_NUM = 40
+# Memory assigned to each fuzzing session (in GB).
+MEM_PER_INSTANCE = 4
 
 
 def run_cmd(cmd_str):
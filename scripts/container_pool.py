@@ -0,0 +1,82 @@
+import os, threading
+
+
+# Idle containers that are already started and staged for a target, waiting to
+# be handed to a work item of that target. A container is taken out of the pool
+# when a work item starts, and put back after an in-container reset when the
+# work item is over, as long as upcoming work items need it.
+class ContainerPool:
+    def __init__(self, size):
+        self.size = size
+        self.idle = {}
+        self.demand = {}
+        self.count = 0
+        self.lock = threading.Lock()
+
+    # Pool containers are renamed to the work item they serve, so their own
+    # names only have to be unique on the host.
+    def new_name(self, job):
+        with self.lock:
+            self.count += 1
+            return "%s-pool-%d-%d" % (os.path.basename(job["outdir"]), os.getpid(),
+                                      self.count)
+
+    def take(self, key):
+        with self.lock:
+            if len(self.idle.get(key, [])) == 0:
+                return None
+            return self.idle[key].pop()
+
+    # Take an idle container of the target that needs it the least.
+    def take_any(self):
+        with self.lock:
+            keys = [key for (key, names) in self.idle.items() if len(names) > 0]
+            if len(keys) == 0:
+                return None
+            key = max(keys, key=lambda x: len(self.idle[x]) - self.demand.get(x, 0))
+            return self.idle[key].pop()
+
+    def put(self, key, name):
+        with self.lock:
+            self.idle.setdefault(key, []).append(name)
+
+    # Whether a container of 'key' is worth recycling.
+    def wants(self, key):
+        with self.lock:
+            return len(self.idle.get(key, [])) < self.demand.get(key, 0)
+
+    # Plan for the next 'size' work items in 'upcoming'. The containers of the
+    # 'running' jobs of a target are recycled for that target when they finish,
+    # so only the rest is warmed up. Returns the jobs to warm up a container
+    # for, and the idle containers no longer needed, which are removed from the
+    # pool.
+    def plan(self, upcoming, running, get_key):
+        with self.lock:
+            self.demand = {}
+            for job in upcoming[:self.size]:
+                key = get_key(job)
+                self.demand[key] = self.demand.get(key, 0) + 1
+            supply = {}
+            for job in running:
+                key = get_key(job)
+                supply[key] = supply.get(key, 0) + 1
+            for (key, names) in self.idle.items():
+                supply[key] = supply.get(key, 0) + len(names)
+            to_warm = []
+            for job in upcoming[:self.size]:
+                key = get_key(job)
+                if supply.get(key, 0) > 0:
+                    supply[key] -= 1
+                else:
+                    to_warm.append(job)
+            to_drop = []
+            for (key, names) in self.idle.items():
+                while len(names) > self.demand.get(key, 0):
+                    to_drop.append(names.pop())
+            return (to_warm, to_drop)
+
+    def drain(self):
+        with self.lock:
+            names = sum(self.idle.values(), [])
+            self.idle = {}
+            return names
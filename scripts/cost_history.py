@@ -0,0 +1,61 @@
+import os, json, fcntl
+
+BASE_DIR = os.path.join(os.path.dirname(__file__), os.pardir)
+# Shared by every experiment, so that each run learns from the previous ones.
+HISTORY_FILE = os.path.join(BASE_DIR, "output", "cost_history.json")
+# Number of recent samples kept per target.
+HISTORY_SIZE = 20
+
+
+# Returns {target: [seconds spent after the time limit, ...]}.
+def load_history(history_file=HISTORY_FILE):
+    if not os.path.exists(history_file):
+        return {}
+    f = open(history_file, "r")
+    buf = f.read()
+    f.close()
+    try:
+        return json.loads(buf)
+    except ValueError:
+        print("Ignoring malformed cost history: %s" % history_file)
+        return {}
+
+
+# The fuzzing time is fixed, so only the time a container keeps its cores
+# after the time limit (replay, coverage, harvest) is recorded.
+def record_cost(target, seconds, history_file=HISTORY_FILE):
+    f = open(history_file, "a+")
+    fcntl.flock(f, fcntl.LOCK_EX)
+    try:
+        f.seek(0)
+        buf = f.read()
+        try:
+            history = json.loads(buf) if buf.strip() != "" else {}
+        except ValueError:
+            history = {}
+        samples = history.get(target, []) + [round(seconds, 1)]
+        history[target] = samples[-HISTORY_SIZE:]
+        f.seek(0)
+        f.truncate()
+        json.dump(history, f, indent=1, sort_keys=True)
+        f.flush()
+    finally:
+        fcntl.flock(f, fcntl.LOCK_UN)
+        f.close()
+
+
+def expected_cost(history, target):
+    samples = history.get(target, [])
+    if len(samples) == 0:
+        return None
+    return sum(samples) / len(samples)
+
+
+# Longest expected jobs first, which shortens the makespan when the jobs
+# outnumber the slots. Targets without history go first, as they may be the
+# longest ones. The sort is stable, so iterations of a target stay in order.
+def order_by_cost(jobs, history, get_target):
+    def sort_key(job):
+        cost = expected_cost(history, get_target(job))
+        return (0, 0) if cost is None else (1, -cost)
+    return sorted(jobs, key=sort_key)
@@ -0,0 +1,493 @@
+import os, io, json, time, socket, struct, tarfile, threading, queue, subprocess
+import http.client
+from urllib.parse import quote, urlencode
+from common import run_cmd, run_cmd_in_docker
+
+DOCKER_SOCK = "/var/run/docker.sock"
+API_VERSION = "v1.41"
+# Number of kept-alive connections to the Docker daemon.
+POOL_SIZE = 16
+# Stream types of the multiplexed exec output (cf. Docker Engine API).
+STDOUT_STREAM = 1
+# How long DockerCLI.remove() waits for the name of a container to be free.
+REMOVE_WAIT_TRIES = 60
+REMOVE_WAIT_INTERVAL = 0.5
+
+
+class DockerError(Exception):
+    pass
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, sock_path):
+        super().__init__("localhost")
+        self.sock_path = sock_path
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(self.sock_path)
+        self.sock = sock
+
+
+# Talks to the Docker Engine API over the local socket. Connections are kept
+# alive and reused, so polling a container costs one HTTP round trip instead of
+# forking a new 'docker' CLI process.
+class DockerClient:
+    def __init__(self, sock_path=DOCKER_SOCK, pool_size=POOL_SIZE):
+        self.sock_path = sock_path
+        self.pool = queue.LifoQueue()
+        self.slots = threading.BoundedSemaphore(pool_size)
+
+    def _acquire(self):
+        self.slots.acquire()
+        try:
+            return self.pool.get_nowait()
+        except queue.Empty:
+            return UnixHTTPConnection(self.sock_path)
+
+    def _release(self, conn, reusable):
+        if reusable:
+            self.pool.put(conn)
+        else:
+            conn.close()
+        self.slots.release()
+
+    # Send a request and hand the response to 'reader' before the connection
+    # goes back to the pool. Returns (status, value returned by 'reader'). A
+    # 'bytes' body is sent as a tar archive, any other body as JSON. Raises
+    # DockerError on an error status, or when the daemon cannot be reached or
+    # the response cannot be read.
+    def _request(self, method, path, body=None, reader=None):
+        print("[*] Docker API: %s %s" % (method, path))
+        headers = {}
+        if isinstance(body, bytes):
+            headers["Content-Type"] = "application/x-tar"
+        elif body is not None:
+            body = json.dumps(body)
+            headers["Content-Type"] = "application/json"
+        conn = self._acquire()
+        reusable = False
+        try:
+            conn.request(method, "/%s%s" % (API_VERSION, path), body, headers)
+            resp = conn.getresponse()
+            if resp.status >= 400 or reader is None:
+                data = resp.read()
+            else:
+                data = reader(resp)
+            reusable = not resp.will_close
+        except (OSError, http.client.HTTPException, tarfile.TarError) as e:
+            raise DockerError("%s %s: %s" % (method, path, e))
+        finally:
+            # A connection whose response was not read through is not reused.
+            self._release(conn, reusable)
+        if resp.status >= 400:
+            raise DockerError("%s %s: %d %s" % (method, path, resp.status, data))
+        return resp.status, data
+
+    def run(self, name, image, cpuset, memory, mems="", tmpfs={}, volumes={}, env={}):
+        host_config = {
+            "AutoRemove": True,
+            "Memory": memory,
+            "CpusetCpus": cpuset,
+            "CpusetMems": mems,
+            "Tmpfs": tmpfs,
+            "Binds": ["%s:%s" % (src, dst) for (src, dst) in volumes.items()],
+        }
+        spec = {
+            "Image": image,
+            "Tty": True,
+            "OpenStdin": True,
+            "Env": ["%s=%s" % (k, v) for (k, v) in env.items()],
+            "HostConfig": host_config,
+        }
+        query = urlencode({"name": name})
+        try:
+            self._request("POST", "/containers/create?%s" % query, spec)
+            self._request("POST", "/containers/%s/start" % quote(name))
+        except DockerError as e:
+            print(e)
+
+    def exec(self, name, cmd_str, is_detached):
+        spec = {
+            "Cmd": ["/bin/bash", "-c", cmd_str],
+            "AttachStdout": not is_detached,
+            "AttachStderr": not is_detached,
+        }
+        try:
+            _, data = self._request("POST", "/containers/%s/exec" % quote(name), spec)
+            exec_id = json.loads(data)["Id"]
+            _, output = self._request("POST", "/exec/%s/start" % exec_id,
+                                      {"Detach": is_detached, "Tty": False},
+                                      read_stdout)
+        except DockerError as e:
+            print(e)
+            return ""
+        return output if output else ""
+
+    def copy_from(self, name, src_path, dst_path):
+        query = urlencode({"path": src_path})
+        path = "/containers/%s/archive?%s" % (quote(name), query)
+        try:
+            self._request("GET", path, reader=lambda resp: extract_tar(resp, dst_path))
+        except DockerError as e:
+            print(e)
+
+    def save_archive(self, name, src_path, tar_path, dst_path):
+        query = urlencode({"path": src_path})
+        path = "/containers/%s/archive?%s" % (quote(name), query)
+        reader = lambda resp: save_tar(resp, tar_path, dst_path)
+        try:
+            self._request("GET", path, reader=reader)
+        except DockerError as e:
+            print(e)
+
+    # Extract the (uncompressed) tar archive 'tar_file' under 'dst_path'.
+    def copy_to(self, name, tar_file, dst_path):
+        query = urlencode({"path": dst_path})
+        path = "/containers/%s/archive?%s" % (quote(name), query)
+        try:
+            self._request("PUT", path, tar_file.read())
+        except DockerError as e:
+            print(e)
+
+    def rename(self, name, new_name):
+        query = urlencode({"name": new_name})
+        try:
+            self._request("POST", "/containers/%s/rename?%s" % (quote(name), query))
+        except DockerError as e:
+            print(e)
+
+    # Move a running container to other cores and memory.
+    def update(self, name, cpuset, memory, mems=""):
+        spec = {
+            "CpusetCpus": cpuset,
+            "CpusetMems": mems,
+            "Memory": memory,
+            "MemorySwap": memory * 2, # Same as 'docker run -m'.
+        }
+        try:
+            self._request("POST", "/containers/%s/update" % quote(name), spec)
+        except DockerError as e:
+            print(e)
+
+    def kill(self, name):
+        try:
+            self._request("POST", "/containers/%s/kill" % quote(name))
+        except DockerError as e:
+            print(e)
+
+    # Remove the container by force, and return once its name is free again.
+    # A killed container is removed asynchronously (AutoRemove).
+    def remove(self, name):
+        try:
+            self._request("DELETE", "/containers/%s?force=true" % quote(name))
+        except DockerError as e:
+            print(e)
+        try:
+            self._request("POST", "/containers/%s/wait?condition=removed" % quote(name))
+        except DockerError: # Already gone.
+            pass
+
+    def is_running(self, name):
+        try:
+            _, data = self._request("GET", "/containers/%s/json" % quote(name))
+        except DockerError:
+            return False
+        return json.loads(data)["State"]["Running"]
+
+
+# Keep only the stdout frames of a multiplexed exec output.
+def read_stdout(resp):
+    chunks = []
+    while True:
+        header = resp.read(8)
+        if len(header) < 8:
+            break
+        stream, size = struct.unpack(">BxxxL", header)
+        payload = resp.read(size)
+        if stream == STDOUT_STREAM:
+            chunks.append(payload)
+    return b"".join(chunks).decode("latin-1")
+
+
+# Same semantics as 'docker cp container:/src dst' with a non-existing 'dst':
+# the contents of '/src' end up directly under 'dst'.
+def extract_tar(fileobj, dst_path):
+    tar = tarfile.open(fileobj=fileobj, mode="r|")
+    for member in tar:
+        parts = member.name.split("/", 1)
+        member.name = parts[1] if len(parts) > 1 else "."
+        tar.extract(member, dst_path)
+    tar.close()
+
+
+# Store the tar stream of '/src' as a compressed archive at 'tar_path', and
+# extract the files directly under '/src' (the logs) to 'dst_path', so that the
+# result can be parsed without unpacking the whole archive.
+def save_tar(fileobj, tar_path, dst_path):
+    os.makedirs(dst_path, exist_ok=True)
+    tar = tarfile.open(fileobj=fileobj, mode="r|")
+    out = tarfile.open(tar_path, "w:gz")
+    for member in tar:
+        if not member.isfile():
+            out.addfile(member)
+            continue
+        data = tar.extractfile(member).read()
+        out.addfile(member, io.BytesIO(data))
+        parts = member.name.split("/", 1)
+        if len(parts) > 1 and "/" not in parts[1]:
+            f = open(os.path.join(dst_path, parts[1]), "wb")
+            f.write(data)
+            f.close()
+    out.close()
+    tar.close()
+
+
+# Same operations as DockerClient, through the 'docker' CLI.
+class DockerCLI:
+    def run(self, name, image, cpuset, memory, mems="", tmpfs={}, volumes={}, env={}):
+        opts = ["--tmpfs %s:%s" % (path, opt) for (path, opt) in tmpfs.items()]
+        opts += ["-v %s:%s" % (src, dst) for (src, dst) in volumes.items()]
+        opts += ["-e %s=%s" % (k, v) for (k, v) in env.items()]
+        if cpuset != "":
+            opts.append("--cpuset-cpus=%s" % cpuset)
+        if mems != "":
+            opts.append("--cpuset-mems=%s" % mems)
+        cmd = "docker run %s --rm -m=%d -it -d --name %s %s" \
+                % (" ".join(opts), memory, name, image)
+        run_cmd(cmd)
+
+    def exec(self, name, cmd_str, is_detached):
+        return run_cmd_in_docker(name, cmd_str, is_detached)
+
+    def copy_from(self, name, src_path, dst_path):
+        run_cmd("docker cp %s:%s %s" % (name, src_path, dst_path))
+
+    def save_archive(self, name, src_path, tar_path, dst_path):
+        cmd = "docker cp %s:%s -" % (name, src_path)
+        print("[*] Executing: %s" % cmd)
+        try:
+            p = subprocess.Popen(cmd.split(), stdout=subprocess.PIPE)
+            save_tar(p.stdout, tar_path, dst_path)
+            p.wait()
+        except Exception as e:
+            print(e)
+
+    def copy_to(self, name, tar_file, dst_path):
+        cmd = "docker cp - %s:%s" % (name, dst_path)
+        print("[*] Executing: %s" % cmd)
+        try:
+            subprocess.run(cmd.split(), stdin=tar_file)
+        except Exception as e:
+            print(e)
+
+    def rename(self, name, new_name):
+        run_cmd("docker rename %s %s" % (name, new_name))
+
+    def update(self, name, cpuset, memory, mems=""):
+        opts = "--cpuset-cpus=%s -m=%d --memory-swap=%d" % (cpuset, memory, memory * 2)
+        if mems != "":
+            opts += " --cpuset-mems=%s" % mems
+        run_cmd("docker update %s %s" % (opts, name))
+
+    def kill(self, name):
+        run_cmd("docker kill %s" % name)
+
+    def remove(self, name):
+        run_cmd("docker rm -f %s" % name)
+        for i in range(REMOVE_WAIT_TRIES):
+            if run_cmd("docker ps -aq -f name=^%s$" % name).strip() == b"":
+                return
+            time.sleep(REMOVE_WAIT_INTERVAL)
+        print("%s is not removed yet" % name)
+
+    def is_running(self, name):
+        output = run_cmd("docker inspect -f {{.State.Running}} %s" % name)
+        return output.strip() == b"true"
+
+
+# In-process stand-in for the Docker daemon, to exercise the orchestration
+# without containers. A campaign started with a '/tool-script/run_*.sh' exec
+# finishes 'finish_delay' seconds later and leaves a minimal '/output'.
+class FakeDockerClient:
+    def __init__(self, finish_delay=0):
+        self.finish_delay = finish_delay
+        self.containers = {}
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def _get(self, name):
+        if name not in self.containers:
+            print("No such container: %s" % name)
+            return None
+        return self.containers[name]
+
+    def _finish(self, name):
+        with self.lock:
+            container = self.containers.get(name)
+            if container is None:
+                return
+            container["files"]["/STATUS"] = "FINISHED\n"
+            logs = {
+                "replay_log.txt": "Crash Replay log for %s\n" % name,
+                "seed_log.txt": "Seed info for %s\n" % name,
+            }
+            env = dict(container["env"])
+            env.update(container["run_env"])
+            # Leave the output where common-postproc.sh would.
+            output_mode = env.get("OUTPUT_MODE", "copy")
+            for (log_name, content) in logs.items():
+                if output_mode == "copy":
+                    container["files"]["/output/" + log_name] = content
+                container["files"]["/box/output/" + log_name] = content
+            for (src, dst) in container["volumes"].items():
+                if dst == "/host-output" and output_mode == "volume":
+                    for (log_name, content) in logs.items():
+                        f = open(os.path.join(src, env["OUTPUT_NAME"], log_name), "w")
+                        f.write(content)
+                        f.close()
+                # Report to the host like common-postproc.sh does.
+                if dst == "/host-status":
+                    f = open(os.path.join(src, env["STATUS_NAME"]), "w")
+                    f.write("FINISHED\n")
+                    f.close()
+
+    def run(self, name, image, cpuset, memory, mems="", tmpfs={}, volumes={}, env={}):
+        with self.lock:
+            self.calls.append(("run", name))
+            if name in self.containers:
+                print("Conflict: %s is already in use" % name)
+                return
+            self.containers[name] = {
+                "image": image, "cpuset": cpuset, "mems": mems, "memory": memory,
+                "volumes": volumes, "env": env, "run_env": {}, "files": {},
+                "staged": False,
+            }
+
+    def exec(self, name, cmd_str, is_detached):
+        with self.lock:
+            self.calls.append(("exec", name, cmd_str))
+            container = self._get(name)
+            if container is None:
+                return ""
+            # Variables assigned in front of the command.
+            env = {}
+            tokens = cmd_str.split()
+            while len(tokens) > 0 and "=" in tokens[0] and "/" not in tokens[0]:
+                key, value = tokens.pop(0).split("=", 1)
+                env[key] = value
+            cmd = " ".join(tokens)
+            if cmd.startswith("/tool-script/run_") and "STAGE_ONLY" in env:
+                container["staged"] = True
+            elif cmd.startswith("/tool-script/run_"):
+                container["staged"] = True
+                container["run_env"] = env
+                timer = threading.Timer(self.finish_delay, self._finish, [name])
+                timer.daemon = True
+                timer.start()
+            elif cmd.startswith("/tool-script/reset.sh"):
+                for path in list(container["files"].keys()):
+                    if path == "/STATUS" or path.startswith("/output/") or \
+                       path.startswith("/box/output/"):
+                        del container["files"][path]
+            elif cmd.startswith("cat "):
+                return container["files"].get(cmd.split()[1], "")
+            return ""
+
+    def copy_from(self, name, src_path, dst_path):
+        with self.lock:
+            self.calls.append(("copy_from", name, src_path))
+            container = self._get(name)
+            if container is None:
+                return
+            for (path, content) in container["files"].items():
+                if not path.startswith(src_path + "/"):
+                    continue
+                dst_file = os.path.join(dst_path, path[len(src_path) + 1:])
+                os.makedirs(os.path.dirname(dst_file), exist_ok=True)
+                f = open(dst_file, "w")
+                f.write(content)
+                f.close()
+
+    def save_archive(self, name, src_path, tar_path, dst_path):
+        with self.lock:
+            self.calls.append(("save_archive", name, src_path))
+            container = self._get(name)
+            if container is None:
+                return
+            buf = io.BytesIO()
+            tar = tarfile.open(fileobj=buf, mode="w")
+            for (path, content) in container["files"].items():
+                if not path.startswith(src_path + "/"):
+                    continue
+                data = content.encode()
+                info = tarfile.TarInfo(os.path.basename(src_path) + path[len(src_path):])
+                info.size = len(data)
+                tar.addfile(info, io.BytesIO(data))
+            tar.close()
+        buf.seek(0)
+        save_tar(buf, tar_path, dst_path)
+
+    def copy_to(self, name, tar_file, dst_path):
+        with self.lock:
+            self.calls.append(("copy_to", name, dst_path))
+            container = self._get(name)
+            if container is None:
+                return
+            tar = tarfile.open(fileobj=tar_file, mode="r|")
+            for member in tar:
+                if member.isfile():
+                    data = tar.extractfile(member).read()
+                    path = os.path.join(dst_path, member.name)
+                    container["files"][path] = data.decode("latin-1")
+            tar.close()
+
+    def rename(self, name, new_name):
+        with self.lock:
+            self.calls.append(("rename", name, new_name))
+            container = self._get(name)
+            if container is None:
+                return
+            if new_name in self.containers:
+                print("Conflict: %s is already in use" % new_name)
+                return
+            self.containers[new_name] = self.containers.pop(name)
+
+    def update(self, name, cpuset, memory, mems=""):
+        with self.lock:
+            self.calls.append(("update", name))
+            container = self._get(name)
+            if container is None:
+                return
+            container.update({"cpuset": cpuset, "memory": memory, "mems": mems})
+
+    def kill(self, name):
+        with self.lock:
+            self.calls.append(("kill", name))
+            if self._get(name) is not None:
+                del self.containers[name]
+
+    def remove(self, name):
+        with self.lock:
+            self.calls.append(("remove", name))
+            self.containers.pop(name, None)
+
+    def is_running(self, name):
+        with self.lock:
+            self.calls.append(("is_running", name))
+            return name in self.containers
+
+
+DOCKER_BACKENDS = ["api", "cli", "fake"]
+
+
+def create_docker_client(backend):
+    if backend == "api":
+        return DockerClient()
+    elif backend == "cli":
+        return DockerCLI()
+    elif backend == "fake":
+        return FakeDockerClient()
+    else:
+        print("Unsupported docker backend: %s" % backend)
+        exit(1)
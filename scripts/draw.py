@@ -14,6 +14,7 @@ PARENT_RE = r'src:([^,]+)'
 SEC_RE = r'(\d+)\s+sec'
 REP_RE = r'rep:(\d+)'
 SEED_FULL_RE = r'Seed - (.*) \(found at'
+BUG_RE = r'-(\d{4}-\d+)$'
 
 seeds = {}
 crashes = {}
@@ -240,10 +241,43 @@ def calculate_mutation_delta(indir):
         crashes[crash]["mutation_delta"] = formatted_diff
 
         
-def calculate_coverage(indir):
+# The coverage of the bug of 'target' (e.g. 2016-4487 of cxxfilt-2016-4487)
+# from the table written by logger_cov.py, which has the coverage of every bug
+# of the program. None for the outputs that have one coverage file per seed.
+# A bug missing from the table was not instrumented, so no seed covers it.
+def read_coverage_table(indir, target):
+    table_path = os.path.join(indir, "coverage.tsv")
+    if not os.path.exists(table_path):
+        return None
+    bug = re.search(BUG_RE, target).group(1)
+    table = {}
+    f = open(table_path, "r")
+    columns = f.readline().rstrip("\n").split("\t")
+    if bug + ":function" not in columns or bug + ":line" not in columns:
+        f.close()
+        return table
+    func_idx = columns.index(bug + ":function")
+    line_idx = columns.index(bug + ":line")
+    for line in f:
+        row = line.rstrip("\n").split("\t")
+        table[row[0]] = (row[func_idx] == "1", row[line_idx] == "1")
+    f.close()
+    return table
+
+
+def calculate_coverage(indir, target):
+    table = read_coverage_table(indir, target)
     for seed in seeds:
+        if table is not None:
+            function_covered, line_covered = table.get(seeds[seed]["full_name"], (False, False))
+            seeds[seed]["coverage"] = coverage_info(function_covered, line_covered)
+            continue
         f_name = seeds[seed]["full_name"]
         f_path = os.path.join(indir, "coverage", f_name)
+        # Programs without a Logger build have no coverage at all.
+        if not os.path.exists(f_path):
+            seeds[seed]["coverage"] = coverage_info(False, False)
+            continue
         f = open(f_path, "r")
         covered_by_seed = f.read().splitlines()
 
@@ -254,13 +288,16 @@ def calculate_coverage(indir):
                 line_covered = True
             elif "[FUNCTION]" in line:
                 function_covered = True
-        cov_info = ""
-        if function_covered:
-            cov_info += "Covered target function"
-        if line_covered:
-            cov_info += ", Covered target line"
-        
-        seeds[seed]["coverage"] = cov_info
+        seeds[seed]["coverage"] = coverage_info(function_covered, line_covered)
+
+
+def coverage_info(function_covered, line_covered):
+    cov_info = ""
+    if function_covered:
+        cov_info += "Covered target function"
+    if line_covered:
+        cov_info += ", Covered target line"
+    return cov_info
 
 
 def generate_vis_dir(indir):
@@ -360,7 +397,7 @@ def main():
     # Calculate mutation delta
     calculate_mutation_delta(indir)
 
-    calculate_coverage(indir)
+    calculate_coverage(indir, target)
     
     outdir = generate_vis_dir(indir)
     generate_json(outdir)
@@ -0,0 +1,115 @@
+import os, re, io, tarfile, tempfile
+
+# Continue the campaigns of a harvested output directory. The queue is handed
+# back to afl-fuzz for an in-place resume ('-i -'), and the old crashes are put
+# aside and merged back after the fuzzing. Every file keeps its found-at time on
+# the clock of the original campaign.
+
+FOUND_RE = r'(?:Seed|Replaying crash) - (\S+) \(found at (-?\d+) sec\.\)'
+# Files of the old output handed to afl-fuzz, besides the queue.
+STATE_FILES = ["fuzzer_stats", "plot_data"]
+
+
+def read_file(path):
+    f = open(path, "r", encoding="latin-1")
+    buf = f.read()
+    f.close()
+    return buf
+
+
+# Contents of the top-level file 'name' of the old output, from the harvested
+# directory, or from its archive when the directory is gone (--output-mode
+# tar). Returns None if the old output has no such file.
+def read_old_file(old_dir, name):
+    path = os.path.join(old_dir, name)
+    if os.path.exists(path):
+        return read_file(path)
+    if not os.path.exists(old_dir + ".tar.gz"):
+        return None
+    buf = None
+    tar = tarfile.open(old_dir + ".tar.gz", "r:gz")
+    for member in tar:
+        if member.isfile() and member.name.split("/", 1)[-1] == name:
+            buf = tar.extractfile(member).read().decode("latin-1")
+            break
+    tar.close()
+    return buf
+
+
+# Fuzzing time of the old campaign, from its fuzzer_stats.
+def read_elapsed(old_dir):
+    buf = read_old_file(old_dir, "fuzzer_stats")
+    if buf is None:
+        return None
+    stats = {}
+    for line in buf.splitlines():
+        if ":" in line:
+            key, value = line.split(":", 1)
+            stats[key.strip()] = value.strip()
+    try:
+        return int(stats["last_update"]) - int(stats["start_time"])
+    except (KeyError, ValueError):
+        return None
+
+
+# Returns {file name: found-at time} from seed_log.txt and replay_log.txt.
+def read_found_times(old_dir):
+    found_times = {}
+    for log_name in ["seed_log.txt", "replay_log.txt"]:
+        buf = read_old_file(old_dir, log_name)
+        if buf is not None:
+            for (name, found_time) in re.findall(FOUND_RE, buf):
+                found_times[name] = int(found_time)
+    return found_times
+
+
+# Yields (path relative to the output directory, data) of the old queue,
+# crashes and state files, from the harvested directory or its archive.
+def iter_old_output(old_dir):
+    def wanted(relpath):
+        parts = relpath.split("/")
+        if len(parts) == 1:
+            return parts[0] in STATE_FILES
+        return len(parts) == 2 and parts[0] in ["queue", "crashes"] and \
+               parts[1].startswith("id:")
+
+    if os.path.exists(old_dir + ".tar.gz"):
+        tar = tarfile.open(old_dir + ".tar.gz", "r:gz")
+        for member in tar:
+            relpath = member.name.split("/", 1)[-1]
+            if member.isfile() and wanted(relpath):
+                yield (relpath, tar.extractfile(member).read())
+        tar.close()
+        return
+    for subdir in ["", "queue", "crashes"]:
+        indir = os.path.join(old_dir, subdir)
+        if not os.path.isdir(indir):
+            continue
+        for name in sorted(os.listdir(indir)):
+            relpath = os.path.join(subdir, name) if subdir != "" else name
+            if os.path.isfile(os.path.join(indir, name)) and wanted(relpath):
+                f = open(os.path.join(indir, name), "rb")
+                yield (relpath, f.read())
+                f.close()
+
+
+# Build the archive to extract at /box: the queue and state files go to
+# 'resume/output', the crashes to 'resume/crashes'. Queue entries and crashes get
+# 'campaign_start' plus their found-at time as mtime, which is how
+# common-postproc.sh computes it again.
+def build_resume_tar(old_dir, campaign_start):
+    found_times = read_found_times(old_dir)
+    fileobj = tempfile.TemporaryFile()
+    tar = tarfile.open(fileobj=fileobj, mode="w")
+    for (relpath, data) in iter_old_output(old_dir):
+        name = os.path.basename(relpath)
+        if relpath.startswith("crashes/"):
+            info = tarfile.TarInfo("resume/" + relpath)
+        else:
+            info = tarfile.TarInfo("resume/output/" + relpath)
+        info.size = len(data)
+        info.mtime = campaign_start + found_times.get(name, 0)
+        tar.addfile(info, io.BytesIO(data))
+    tar.close()
+    fileobj.seek(0)
+    return fileobj
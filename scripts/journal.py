@@ -0,0 +1,72 @@
+import os, json, time
+
+JOURNAL_FILE = "journal.log"
+# Life cycle of a work item, in order.
+JOB_STATES = ["spawned", "running", "finished", "harvested", "cleaned"]
+
+
+# Write-ahead log of an experiment. Every state change of a work item is
+# appended as one JSON line and synced to disk before the scheduler moves on,
+# so that a killed run_experiment.py can be resumed from the last known state.
+class Journal:
+    def __init__(self, outdir):
+        self.f = open(os.path.join(outdir, JOURNAL_FILE), "a")
+
+    def _append(self, entry):
+        entry["time"] = time.time()
+        self.f.write(json.dumps(entry) + "\n")
+        self.f.flush()
+        os.fsync(self.f.fileno())
+
+    def record_experiment(self, info):
+        entry = {"state": "experiment"}
+        entry.update(info)
+        self._append(entry)
+
+    def record(self, job, state):
+        entry = {"state": state}
+        entry.update(job)
+        self._append(entry)
+
+    def close(self):
+        self.f.close()
+
+
+# The journals of several experiments scheduled together. Each job is recorded
+# in the journal of its own output directory.
+class JournalSet:
+    def __init__(self, outdirs):
+        self.journals = {}
+        for outdir in outdirs:
+            self.journals[outdir] = Journal(outdir)
+
+    def record_experiment(self, outdir, info):
+        self.journals[outdir].record_experiment(info)
+
+    def record(self, job, state):
+        self.journals[job["outdir"]].record(job, state)
+
+    def close(self):
+        for journal in self.journals.values():
+            journal.close()
+
+
+# Returns (experiment info, {container: last entry of the container}).
+def read_journal(outdir):
+    info = {}
+    jobs = {}
+    path = os.path.join(outdir, JOURNAL_FILE)
+    if not os.path.exists(path):
+        return (info, jobs)
+    f = open(path, "r")
+    for line in f:
+        try:
+            entry = json.loads(line)
+        except ValueError: # A partial line written when the host died.
+            continue
+        if entry["state"] == "experiment":
+            info = entry
+        else:
+            jobs[entry["container"]] = entry
+    f.close()
+    return (info, jobs)
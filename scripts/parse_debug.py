@@ -1,16 +1,25 @@
-import sys, os
+import sys, os, re
+import numpy as np
 import pandas as pd
 import csv
-from benchmark import check_targeted_crash
+from verdict_cache import check_targeted_crash
 from benchmark import FUZZ_TARGETS
+from parse_result import iter_replay_log, check_archives
 SCRIPT_PATH=os.path.dirname(os.path.realpath(__file__))
 
 REPLAY_LOG_FILE = "replay_log.txt"
 REPLAY_SEED_FILE = "seed_log.txt"
 FUZZ_LOG_FILE = "fuzzer_stats"
-REPLAY_ITEM_SIG = "Replaying crash - "
-ADDITIONAL_INFO_SIG = " is located "
-FOUND_TIME_SIG = "found at "
+COVERAGE_FILE = "coverage.tsv"
+VALUE_TRACE_FILE = "value_trace.bin"
+# Records of __logger_log_value() in the runtime of the Logger. The Logger pass
+# records the variables listed in the Logger target file of a bug, in the order
+# of VAR_DICT_SEED, with the id (N << VAR_ID_SHIFT) | <index of the variable>,
+# where N is the index of the bug in the Logger build of its program.
+VALUE_REC_DTYPE = np.dtype([("input", "<u4"), ("var", "<u4"), ("value", "<i8")])
+# Same as LOGGER_VAR_SHIFT in config.h of the Logger.
+VAR_ID_SHIFT = 16
+BUG_RE = r'-(\d{4}-\d+)$'
 CSV_COLUMNS = ["Target", "TTE", "Total Seeds", "TTF", "Seeds to Func", "TTL", "Seeds to Line", "Crash Found Time", "Line Reached Time", "Avg Diff Time"]
 
 VAR_DICT_SEED = {
@@ -95,9 +104,14 @@ def min_max_tte(tte_list, timeout):
 
 
 def get_experiment_info(outdir):
+    check_archives(outdir)
     targ_list = []
     max_iter_id = 0
     for d in os.listdir(outdir):
+        # Skip the bookkeeping files and output archives written by
+        # run_experiment.py.
+        if "-iter-" not in d or not os.path.isdir(os.path.join(outdir, d)):
+            continue
         if d.endswith("-iter-0"):
             targ = d[:-len("-iter-0")]
             targ_list.append(targ)
@@ -110,26 +124,9 @@ def get_experiment_info(outdir):
 
 def parse_tte(targ, targ_dir):
     log_file = os.path.join(targ_dir, REPLAY_LOG_FILE)
-    f = open(log_file, "r", encoding="latin-1")
-    buf = f.read()
-    f.close()
-    while REPLAY_ITEM_SIG in buf:
-        # Proceed to the next item.
-        start_idx = buf.find(REPLAY_ITEM_SIG)
-        buf = buf[start_idx + len(REPLAY_ITEM_SIG):]
-        # Identify the end of this replay.
-        if REPLAY_ITEM_SIG in buf:
-            end_idx = buf.find(REPLAY_ITEM_SIG)
-        else: # In case this is the last replay item.
-            end_idx = len(buf)
-        replay_buf = buf[:end_idx]
-        # If there is trailing allocsite information, remove it.
-        if ADDITIONAL_INFO_SIG in replay_buf:
-            remove_idx = buf.find(ADDITIONAL_INFO_SIG)
-            replay_buf = replay_buf[:remove_idx]
-        if check_targeted_crash(targ, replay_buf):
-            found_time = int(replay_buf.split(FOUND_TIME_SIG)[1].split()[0])
-            return found_time
+    for item in iter_replay_log(log_file):
+        if check_targeted_crash(targ, item.buf):
+            return item.found_time
     # If not found, return a high value to indicate timeout. When computing the
     # median value, should confirm that such timeouts are not more than a half.
     return None
@@ -201,6 +198,68 @@ def first_input_to_target(log_file, targ, VAR_DICT):
     # print("Total count: %d, Func count: %d, Line count: %d" % (total_count, func_count, line_count))
     return input_to_func, input_to_line, func_count, line_count, total_count
 
+# Map the value trace of a campaign in place, as an array of VALUE_REC_DTYPE.
+def read_value_trace(path):
+    if os.path.getsize(path) == 0:
+        return np.zeros(0, dtype=VALUE_REC_DTYPE)
+    return np.memmap(path, dtype=VALUE_REC_DTYPE, mode="r")
+
+
+# Min, max, cardinality and histogram (distinct values and their counts) of the
+# variable 'var_id' in 'trace', among the records of 'inputs' if given.
+def summarize_values(trace, var_id, inputs=None):
+    mask = trace["var"] == var_id
+    if inputs is not None:
+        mask &= np.isin(trace["input"], inputs)
+    values, counts = np.unique(trace["value"][mask], return_counts=True)
+    if len(values) == 0:
+        return None
+    return {"min": int(values[0]), "max": int(values[-1]),
+            "cardinality": len(values), "histogram": (values, counts)}
+
+
+# Ids of the seeds that reach the target line of 'targ', from the coverage
+# table written in the post-processing.
+def line_reaching_inputs(targ, targ_dir):
+    bug = re.search(BUG_RE, targ).group(1)
+    f = open(os.path.join(targ_dir, COVERAGE_FILE), "r")
+    columns = f.readline().rstrip("\n").split("\t")
+    line_idx = columns.index(bug + ":line")
+    inputs = []
+    for line in f:
+        row = line.rstrip("\n").split("\t")
+        if row[line_idx] == "1" and row[0].startswith("id:"):
+            inputs.append(int(row[0][3:9]))
+    f.close()
+    return np.array(inputs, dtype=np.uint32)
+
+
+# Same as the '@@@' lines of first_input_to_target(), from a binary value trace:
+# only the values recorded by seeds that reach the target line are kept. The
+# summary of each variable in this iteration is printed as well.
+def read_traced_values(targ, targ_dir, VAR_DICT):
+    # The bugs of the coverage table are in the order of the Logger build.
+    bug = re.search(BUG_RE, targ).group(1)
+    f = open(os.path.join(targ_dir, COVERAGE_FILE), "r")
+    columns = f.readline().rstrip("\n").split("\t")
+    f.close()
+    if bug + ":function" not in columns:
+        return
+    bug_idx = (columns.index(bug + ":function") - 1) // 2
+    trace = read_value_trace(os.path.join(targ_dir, VALUE_TRACE_FILE))
+    inputs = line_reaching_inputs(targ, targ_dir)
+    for (var_idx, var) in enumerate(VAR_DICT[targ]):
+        var_id = (bug_idx << VAR_ID_SHIFT) | var_idx
+        summary = summarize_values(trace, var_id, inputs)
+        if summary is None:
+            continue
+        values, counts = summary["histogram"]
+        print("[%s] %s: min %d, max %d, %d distinct values, %d most frequent (%d times)" %
+              (os.path.basename(targ_dir), var, summary["min"], summary["max"],
+               summary["cardinality"], values[counts.argmax()], counts.max()))
+        VAR_DICT[targ][var].update(values.tolist())
+
+
 def parse_ttt(targ, outdir, redir, iter_cnt):
     # redir has text files named as iteration number (ex. from 0 to 39)
     # It lists the seeds generated in that iteration and writes [Function] or [Line] after the id of each seed
@@ -225,6 +284,10 @@ def parse_ttt(targ, outdir, redir, iter_cnt):
         crash_time_to_line = 86400
         
         seed_to_func, seed_to_line, seed_to_func_cnt, seed_to_line_cnt, total_count = first_input_to_target(seed_log_file,targ, VAR_DICT_SEED)
+        targ_dir = os.path.join(outdir, "%s-iter-%d" % (targ, iter_id))
+        if targ in VAR_DICT_SEED and os.path.exists(os.path.join(targ_dir, VALUE_TRACE_FILE)) \
+                and os.path.exists(os.path.join(targ_dir, COVERAGE_FILE)):
+            read_traced_values(targ, targ_dir, VAR_DICT_SEED)
         crash_to_func, crash_to_line, _, _, _ = first_input_to_target(crash_log_file,targ, VAR_DICT_CRASH)
         
         # # now read the original replay log and find the time-to-target for the seed
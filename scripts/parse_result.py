@@ -1,7 +1,7 @@
-import sys, os
+import sys, os, mmap
 import pandas as pd
 import re
-from benchmark import check_targeted_crash
+from verdict_cache import check_targeted_crash
 from benchmark import FUZZ_TARGETS
 SCRIPT_PATH=os.path.dirname(os.path.realpath(__file__))
 
@@ -10,11 +10,76 @@ FUZZ_LOG_FILE = "fuzzer_stats"
 REPLAY_ITEM_SIG = "Replaying crash - "
 ADDITIONAL_INFO_SIG = " is located "
 FOUND_TIME_SIG = "found at "
+# Work items harvested with 'run_experiment.py --output-mode tar'.
+ARCHIVE_EXT = ".tar.gz"
 
 ID_RE = r'id:(\d{6})'
 CRASH_FULL_RE = r'(id:[^ ]+) \(found at'
 REP_RE = r'rep:(\d+)'
 PARENT_RE = r'src:([^,]+)'
+OP_RE = r'op:([^, ]+)'
+
+
+# One item of a replay log. 'buf' is a view of the mapped log, from the crash
+# name to the end of its ASAN report (without the trailing allocsite info), and
+# is only valid until the next item is read.
+class ReplayItem:
+    def __init__(self, header, buf):
+        self.buf = buf
+        match = re.search(CRASH_FULL_RE, header)
+        self.name = match.group(1) if match is not None else None
+        match = re.search(ID_RE, header)
+        self.crash_id = match.group(1) if match is not None else None
+        match = re.search(PARENT_RE, header)
+        self.parents = [int(x) for x in match.group(1).split("+")] if match is not None else []
+        match = re.search(OP_RE, header)
+        self.op = match.group(1) if match is not None else None
+        match = re.search(REP_RE, header)
+        self.rep = match.group(1) if match is not None else None
+        self.found_time = None
+        if FOUND_TIME_SIG in header:
+            self.found_time = int(header.split(FOUND_TIME_SIG)[1].split()[0])
+
+    def text(self):
+        return str(self.buf, "latin-1")
+
+
+# Walk the replay log at 'log_file' through mmap, without copying it, and yield
+# its items in order.
+def iter_replay_log(log_file):
+    f = open(log_file, "rb")
+    if os.fstat(f.fileno()).st_size == 0:
+        f.close()
+        return
+    mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    f.close()
+    view = memoryview(mm)
+    item_sig = REPLAY_ITEM_SIG.encode()
+    info_sig = ADDITIONAL_INFO_SIG.encode()
+    item = None
+    try:
+        start_idx = mm.find(item_sig)
+        while start_idx != -1:
+            start_idx += len(item_sig)
+            next_idx = mm.find(item_sig, start_idx)
+            end_idx = next_idx if next_idx != -1 else len(mm)
+            # If there is trailing allocsite information, remove it.
+            remove_idx = mm.find(info_sig, start_idx, end_idx)
+            if remove_idx != -1:
+                end_idx = remove_idx
+            header_end = mm.find(b"\n", start_idx, end_idx)
+            if header_end == -1:
+                header_end = end_idx
+            item = ReplayItem(str(view[start_idx:header_end], "latin-1"),
+                              view[start_idx:end_idx])
+            yield item
+            item.buf.release()
+            start_idx = next_idx
+    finally:
+        if item is not None:
+            item.buf.release()
+        view.release()
+        mm.close()
 
 
 def replace_none(tte_list, timeout):
@@ -66,10 +131,30 @@ def min_max_tte(tte_list, timeout):
     return ("%d" % min_val, "%s%d" % (prefix, max_val))
 
 
+# With --output-mode tar, a work item is an archive, and its top-level logs are
+# extracted to the directory next to it. An archive without that directory
+# cannot be parsed, so stop instead of leaving the work item out.
+def check_archives(outdir):
+    for d in os.listdir(outdir):
+        if "-iter-" not in d or not d.endswith(ARCHIVE_EXT):
+            continue
+        work_dir = os.path.join(outdir, d[:-len(ARCHIVE_EXT)])
+        if not os.path.isdir(work_dir):
+            print("Only the archive of %s is left, extract it first:" % work_dir)
+            print("    mkdir %s && tar xzf %s.tar.gz -C %s --strip-components=1"
+                  % (work_dir, work_dir, work_dir))
+            exit(1)
+
+
 def get_experiment_info(outdir):
+    check_archives(outdir)
     targ_list = []
     max_iter_id = 0
     for d in os.listdir(outdir):
+        # Skip the bookkeeping files and output archives written by
+        # run_experiment.py.
+        if "-iter-" not in d or not os.path.isdir(os.path.join(outdir, d)):
+            continue
         if d.endswith("-iter-0"):
             targ = d[:-len("-iter-0")]
             targ_list.append(targ)
@@ -80,43 +165,26 @@ def get_experiment_info(outdir):
     return (targ_list, iter_cnt)
 
 
+def parse_tte(targ, targ_dir):
+    log_file = os.path.join(targ_dir, REPLAY_LOG_FILE)
+    for item in iter_replay_log(log_file):
+        if check_targeted_crash(targ, item.buf):
+            return item.found_time
+    # If not found, return None to indicate timeout. When computing the median
+    # value, should confirm that such timeouts are not more than a half.
+    return None
+
+
 def identify_crashes(targ, targ_dir):
     log_file = os.path.join(targ_dir, REPLAY_LOG_FILE)
-    f = open(log_file, "r", encoding="latin-1")
-    buf = f.read()
-    f.close()
     target_crashes = {}
-    while REPLAY_ITEM_SIG in buf:
-        # Proceed to the next item.
-        start_idx = buf.find(REPLAY_ITEM_SIG)
-        buf = buf[start_idx + len(REPLAY_ITEM_SIG):]
-        # Identify the end of this replay.
-        if REPLAY_ITEM_SIG in buf:
-            end_idx = buf.find(REPLAY_ITEM_SIG)
-        else: # In case this is the last replay item.
-            end_idx = len(buf)
-        replay_buf = buf[:end_idx]
-        # If there is trailing allocsite information, remove it.
-        if ADDITIONAL_INFO_SIG in replay_buf:
-            remove_idx = buf.find(ADDITIONAL_INFO_SIG)
-            replay_buf = replay_buf[:remove_idx]
-        if check_targeted_crash(targ, replay_buf):
-            crash_full_name = re.search(CRASH_FULL_RE, replay_buf).group(1)
-            crash_id = re.search(ID_RE, replay_buf).group(1)
-            reps = re.search(REP_RE, replay_buf).group(1)
-            mutation_string = f'{reps} operations overlapped'
-            parents = re.search(PARENT_RE, replay_buf).group(1)
-            if "+" in parents:
-                parents = parents.split("+")
-            else:
-                parents = [parents]
-
-            parents = [int(p) for p in parents]
-            found_time = int(replay_buf.split(FOUND_TIME_SIG)[1].split()[0])
-            target_crashes[crash_id] = {
-                "full_name": crash_full_name,
-                "found_time": found_time,
-                "parents": parents,
+    for item in iter_replay_log(log_file):
+        if check_targeted_crash(targ, item.buf):
+            mutation_string = f'{item.rep} operations overlapped'
+            target_crashes[item.crash_id] = {
+                "full_name": item.name,
+                "found_time": item.found_time,
+                "parents": item.parents,
                 "mutation": mutation_string}
     return target_crashes
 
@@ -141,6 +209,9 @@ def analyze_targ_result(outdir, timeout, targ, iter_cnt):
     timeout_list=[]
     for iter_id in range(iter_cnt):
         targ_dir = os.path.join(outdir, "%s-iter-%d" % (targ, iter_id))
+        # With --adaptive, converged targets have fewer iterations.
+        if not os.path.isdir(targ_dir):
+            continue
         tte = parse_tte(targ, targ_dir)
         tte_list.append(tte)
         if tte == None:
@@ -33,8 +33,9 @@ def run(indir, target):
     os.makedirs(os.path.join(OUT_DIR,ex_id,target), exist_ok=True)
 
     # Parse the seed info
+    check_archives(indir)
     for iter_dir in os.listdir(indir):
-        if target not in iter_dir:
+        if target not in iter_dir or not os.path.isdir(os.path.join(indir, iter_dir)):
             continue     
         iter = iter_dir.split("-iter-")[1]
         # 1. Read queue names and the inheritance info to form a node and edges, ans the timestamp too
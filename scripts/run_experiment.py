@@ -1,9 +1,40 @@
-import sys, os, time, csv
-from common import run_cmd, run_cmd_in_docker, check_cpu_count, fetch_works
-from benchmark import generate_fuzzing_worklist
+import os, time, csv, shutil, argparse, asyncio
+from concurrent.futures import ThreadPoolExecutor
+from common import check_cpu_count, MAX_INSTANCE_NUM, MEM_PER_INSTANCE
+from docker_client import create_docker_client, DOCKER_BACKENDS
+from allocator import CoreAllocator, cpuset_str
+from journal import JournalSet, read_journal
+from status_watcher import StatusWatcher, STATUS_DIR, CONTAINER_STATUS_DIR
+from cost_history import load_history, record_cost, order_by_cost
+from container_pool import ContainerPool
+from extend import read_elapsed, read_old_file, build_resume_tar
+from benchmark import generate_fuzzing_worklist, FUZZ_TARGETS
 
 BASE_DIR = os.path.join(os.path.dirname(__file__), os.pardir)
 IMAGE_NAME = "genevis-framework"
+# Wait between attempts to get cores when the host is fully leased.
+POLL_INTERVAL = 60
+# Give up on a container whose post-processing takes longer than this.
+MAX_POSTPROC_TIME = 120 * 60
+# Cores leased to an idle container of the warm pool.
+WARM_CONTAINER_CORES = 1
+START_TIME_FILE = "start_times.csv"
+# Symbolized frames of the crash replays, kept across campaigns and shared by
+# every experiment (see symbolize.py).
+SYMBOL_CACHE_DIR = os.path.join(BASE_DIR, "output", "symbol-cache")
+CONTAINER_SYMBOL_CACHE_DIR = "/symbol-cache"
+# How the output of a campaign reaches the host. 'copy' copies it out of the
+# container after post-processing, 'volume' lets the fuzzer write straight to a
+# host directory, and 'tar' streams a compressed archive of it to the host.
+OUTPUT_MODES = ["copy", "volume", "tar"]
+# Maximum number of concurrent Docker operations per phase in --async mode.
+PHASE_CONCURRENCY = {
+    "spawn": 8,
+    "launch": 16,
+    "poll": 16,
+    "harvest": 4,
+    "cleanup": 16,
+}
 SUPPORTED_TOOLS = \
   ["AFL", "AFLGo", "AFLPP", "Beacon", "WindRanger",
    "DAFL", "DAFL_noasan", "DAFL_select", "DAFL_schedule", "DAFL_poc", "DAFL_naive",
@@ -25,84 +56,570 @@ def decide_outdir(exp_id, tool):
             return outdir
 
 
-def spawn_containers(works):
-    for i in range(len(works)):
-        targ_prog, _, _, iter_id = works[i]
-        cmd = "docker run --tmpfs /box:exec --rm -m=4g --cpuset-cpus=%d -it -d --name %s-%s %s" \
-                % (i, targ_prog, iter_id, IMAGE_NAME)
-        run_cmd(cmd)
+# The most recent output directory of the experiment, to resume it.
+def find_outdir(exp_id, tool):
+    outdir = decide_outdir(exp_id, tool)
+    i = int(outdir.split("-")[-1])
+    if i == 1:
+        print("No previous output directory of %s-%s to resume" % (exp_id, tool))
+        exit(1)
+    return outdir[:outdir.rfind("-")] + "-%d" % (i - 1)
 
 
-def run_fuzzing(works, tool, timelimit):
-    for (targ_prog, cmdline, src, iter_id) in works:
-        cmd = "/tool-script/run_%s.sh %s \"%s\" %s %d" % \
-                (tool, targ_prog, cmdline, src, timelimit)
-        run_cmd_in_docker("%s-%s" % (targ_prog, iter_id), cmd, True)
+def work_name(work):
+    targ_prog, _, _, iter_id = work
+    return "%s-%s" % (targ_prog, iter_id)
 
 
-def wait_finish(works, timelimit):
-    time.sleep(timelimit)
-    total_count = len(works)
-    elapsed_min = 0
-    while True:
-        if elapsed_min > 120:
-            break
-        time.sleep(60)
-        elapsed_min += 1
-        print("Waited for %d min" % elapsed_min)
-        finished_count = 0
-        for (targ_prog, _, _, iter_id) in works:
-            container = "%s-%s" % (targ_prog, iter_id)
-            stat_str = run_cmd_in_docker(container, "cat /STATUS", False)
-            if "FINISHED" in stat_str:
-                finished_count += 1
+# Containers are named after the output directory as well, so that several
+# experiments can run on the same host.
+def new_job(work, tool, timelimit, outdir, output_mode="copy", cores=1,
+            early_stop=False):
+    container = "%s-%s" % (os.path.basename(outdir), work_name(work))
+    return {"work": work, "tool": tool, "timelimit": timelimit,
+            "outdir": outdir, "container": container, "lease": None,
+            "output_mode": output_mode, "cores": cores, "early_stop": early_stop,
+            "extend_from": None, "elapsed": 0}
+
+
+def status_dir(job):
+    return os.path.join(os.path.abspath(job["outdir"]), STATUS_DIR)
+
+
+def work_dir(job):
+    return os.path.join(os.path.abspath(job["outdir"]), work_name(job["work"]))
+
+
+def pool_key(job):
+    return (job["outdir"], job["work"][0])
+
+
+def container_volumes(job):
+    volumes = {
+        status_dir(job): CONTAINER_STATUS_DIR,
+        os.path.abspath(SYMBOL_CACHE_DIR): CONTAINER_SYMBOL_CACHE_DIR,
+    }
+    if job["output_mode"] == "volume":
+        volumes[os.path.abspath(job["outdir"])] = "/host-output"
+    return volumes
+
+
+# Copy the target, seeds and dictionary to /box, unless they are there already.
+def stage_box(client, name, job):
+    targ_prog, cmdline, src, _ = job["work"]
+    cmd = "STAGE_ONLY=1 /tool-script/run_%s.sh %s \"%s\" %s 0" % \
+            (job["tool"], targ_prog, cmdline, src)
+    client.exec(name, cmd, False)
+
+
+# Lease a core for an idle container of the pool, named 'name', with the
+# memory of the work items of 'job'. Returns None if the host is fully leased.
+def lease_warm_container(allocator, name, job):
+    memory = MEM_PER_INSTANCE * job["cores"] * 1024 ** 3
+    return allocator.acquire(name, WARM_CONTAINER_CORES, memory)
+
+
+def drop_warm_container(client, allocator, name):
+    client.kill(name)
+    allocator.release(name)
+
+
+# Start and stage an idle container for the target of 'job', on a core of its
+# own, so that staging does not run on the cores of other work items. It is
+# moved to the cores of the work item that takes it.
+def warm_up_container(client, allocator, pool, job):
+    name = pool.new_name(job)
+    lease = lease_warm_container(allocator, name, job)
+    if lease is None:
+        return
+    client.run(name, IMAGE_NAME, cpuset_str(lease), lease["memory"],
+               mems=str(lease["node"]), tmpfs={"/box": "exec"},
+               volumes=container_volumes(job))
+    stage_box(client, name, job)
+    pool.put(pool_key(job), name)
+
+
+def spawn_container(client, allocator, pool, job):
+    lease = job["lease"]
+    name = job.pop("warm_container", None)
+    if name is None and pool is not None:
+        name = pool.take(pool_key(job))
+    if name is None:
+        client.run(job["container"], IMAGE_NAME, cpuset_str(lease), lease["memory"],
+                   mems=str(lease["node"]), tmpfs={"/box": "exec"},
+                   volumes=container_volumes(job))
+    else:
+        print("%s takes the warm container %s" % (job["container"], name))
+        client.rename(name, job["container"])
+        client.update(job["container"], cpuset_str(lease), lease["memory"],
+                      str(lease["node"]))
+        allocator.release(name)
+
+
+# Returns the time the fuzzer was started. Staging is done before, so that the
+# gap between the assignment of the cores and this time shows what a warm
+# container saves.
+def run_fuzzing(client, job):
+    targ_prog, cmdline, src, _ = job["work"]
+    stage_box(client, job["container"], job)
+    if job["output_mode"] == "volume":
+        # Start from an empty directory, afl-fuzz refuses to overwrite the
+        # output of a campaign that was interrupted.
+        if os.path.exists(work_dir(job)):
+            shutil.rmtree(work_dir(job))
+        os.makedirs(work_dir(job))
+    env = "STATUS_NAME=%s OUTPUT_MODE=%s OUTPUT_NAME=%s" % \
+            (job["container"], job["output_mode"], work_name(job["work"]))
+    if job["early_stop"]:
+        env += " EARLY_STOP=1"
+    if job["extend_from"] is not None:
+        # The campaign goes on from where the previous one stopped, on its clock.
+        campaign_start = int(time.time()) - job["elapsed"]
+        tar_file = build_resume_tar(job["extend_from"], campaign_start)
+        client.copy_to(job["container"], tar_file, "/box")
+        tar_file.close()
+        env += " EXTEND=1 CAMPAIGN_START=%d" % campaign_start
+    # One fuzzer instance runs on each leased core.
+    cmd = "%s /tool-script/run_%s.sh %s \"%s\" %s %d \"\" %d" % \
+            (env, job["tool"], targ_prog, cmdline, src, job["timelimit"], job["cores"])
+    client.exec(job["container"], cmd, True)
+    return time.time()
+
+
+# Continue the campaign of the same work item in 'old_outdir' for the rest of
+# the time limit. Returns False if there is no campaign or no time left.
+def extend_job(job, old_outdir):
+    old_dir = os.path.join(old_outdir, work_name(job["work"]))
+    elapsed = read_elapsed(old_dir)
+    if elapsed is None:
+        print("No campaign of %s to extend in %s" % (work_name(job["work"]), old_outdir))
+        return False
+    if read_old_file(old_dir, "instances.tsv") is not None:
+        print("Cannot extend the parallel campaign in %s" % old_dir)
+        return False
+    if elapsed >= job["timelimit"]:
+        print("%s already ran for %d sec., skipping it" % (old_dir, elapsed))
+        return False
+    job["extend_from"] = old_dir
+    job["elapsed"] = elapsed
+    job["timelimit"] -= elapsed
+    return True
+
+
+# Match the output directories given to --extend with the tools, by the tool in
+# their journal, or in their name for the runs that have no journal.
+def find_extended_outdirs(extend, tools):
+    old_outdirs = {}
+    for old_outdir in extend.split(","):
+        if not os.path.isdir(old_outdir):
+            print("No such output directory: %s" % old_outdir)
+            exit(1)
+        info, _ = read_journal(old_outdir)
+        tool = info.get("tool", os.path.basename(old_outdir.rstrip("/")).split("-")[-2])
+        if tool not in tools:
+            print("%s is not an output directory of %s" % (old_outdir, ",".join(tools)))
+            exit(1)
+        old_outdirs[tool] = os.path.abspath(old_outdir)
+    for tool in tools:
+        if tool not in old_outdirs:
+            print("No output directory of %s to extend" % tool)
+            exit(1)
+    return old_outdirs
+
+
+def check_finished(client, job):
+    stat_str = client.exec(job["container"], "cat /STATUS", False)
+    return "FINISHED" in stat_str
+
+
+def store_output(client, job):
+    if job["output_mode"] == "volume": # Already on the host.
+        return
+    elif job["output_mode"] == "tar":
+        client.save_archive(job["container"], "/box/output",
+                            work_dir(job) + ".tar.gz", work_dir(job))
+    else:
+        client.copy_from(job["container"], "/output", work_dir(job))
+
+
+# Kill the container, or put it back to the pool if an upcoming work item of
+# the same target can use it. A recycled container is moved to a core of its
+# own before the work item releases its cores. Only containers that reported
+# FINISHED are recycled: the post-processing of the others may still be
+# writing to /box.
+def cleanup_container(client, allocator, pool, job):
+    if pool is None or not job.get("finished") or not pool.wants(pool_key(job)):
+        client.kill(job["container"])
+        return
+    name = pool.new_name(job)
+    lease = lease_warm_container(allocator, name, job)
+    if lease is None:
+        client.kill(job["container"])
+        return
+    client.exec(job["container"], "/tool-script/reset.sh", False)
+    client.rename(job["container"], name)
+    client.update(name, cpuset_str(lease), lease["memory"], str(lease["node"]))
+    pool.put(pool_key(job), name)
+
+
+def record_start_times(jobs):
+    for job in jobs:
+        f = open(os.path.join(job["outdir"], START_TIME_FILE), "a")
+        writer = csv.writer(f)
+        writer.writerow([work_name(job["work"]), "%.3f" % job["start_time"],
+                         "%.3f" % job["startup_time"]])
+        f.close()
+
+
+async def run_phase_async(executor, phase, func, args_list):
+    sem = asyncio.Semaphore(PHASE_CONCURRENCY[phase])
+    loop = asyncio.get_running_loop()
+
+    async def run_one(args):
+        async with sem:
+            return await loop.run_in_executor(executor, func, *args)
+
+    return await asyncio.gather(*[run_one(args) for args in args_list])
+
+
+# Apply 'func' to every element of 'args_list'. Without an executor, this is a
+# plain serial loop; otherwise, up to PHASE_CONCURRENCY[phase] calls run at once.
+def run_phase(executor, phase, func, args_list):
+    if executor is None or len(args_list) <= 1:
+        return [func(*args) for args in args_list]
+    return asyncio.run(run_phase_async(executor, phase, func, args_list))
+
+
+# Keep every slot busy: a new work item is started as soon as any running
+# container finishes its post-processing and releases its cores. 'running'
+# holds the jobs reattached by --resume.
+def schedule_works(client, allocator, journal, pending, running, use_async=False,
+                   pool=None, controller=None):
+    if controller is not None:
+        drop_converged(controller, pending)
+    watcher = StatusWatcher()
+    for job in pending + running:
+        watcher.watch(status_dir(job))
+    executor = None
+    if use_async:
+        executor = ThreadPoolExecutor(max(PHASE_CONCURRENCY.values()))
+    memory = MEM_PER_INSTANCE * 1024 ** 3
+    while len(pending) > 0 or len(running) > 0:
+        starts = []
+        while len(pending) > 0 and len(running) + len(starts) < MAX_INSTANCE_NUM:
+            job = pending[0]
+            job["lease"] = allocator.acquire(job["container"], job["cores"],
+                                             memory * job["cores"])
+            if job["lease"] is None and pool is not None:
+                job["lease"] = acquire_from_pool(client, allocator, pool, job,
+                                                 memory * job["cores"])
+            if job["lease"] is None:
+                print("No free core on this host, %s has to wait" % job["container"])
+                break
+            job["assign_time"] = time.time()
+            pending.pop(0)
+            starts.append(job)
+        # A work item rerun by --resume may have left the report of its
+        # previous container, which would end the new campaign at once.
+        for job in starts:
+            watcher.forget(status_dir(job), job["container"])
+        run_phase(executor, "spawn", spawn_container,
+                  [(client, allocator, pool, job) for job in starts])
+        for job in starts:
+            journal.record(job, "spawned")
+        start_times = run_phase(executor, "launch", run_fuzzing,
+                                [(client, job) for job in starts])
+        # Deadlines follow the actual start time of each container.
+        for (job, start_time) in zip(starts, start_times):
+            job["start_time"] = start_time
+            job["startup_time"] = start_time - job["assign_time"]
+            print("%s started %.1f sec. after getting its cores"
+                  % (job["container"], job["startup_time"]))
+            job["deadline"] = start_time + job["timelimit"]
+            journal.record(job, "running")
+        record_start_times(starts)
+        running += starts
+        if pool is not None:
+            warm_pool(client, allocator, pool, executor, pending, running)
+
+        if len(running) == 0: # Other experiments occupy the whole host.
+            time.sleep(POLL_INTERVAL)
+            continue
+        # Wake up when a container reports, or when the post-processing of a
+        # container takes too long.
+        giveup_time = min([job["deadline"] + MAX_POSTPROC_TIME for job in running])
+        reported = watcher.wait(giveup_time - time.time(),
+                                [job["container"] for job in running])
+
+        now = time.time()
+        done = []
+        late = []
+        for job in running:
+            if job["container"] in reported:
+                print("%s finished" % job["container"])
+                job["finished"] = True
+                done.append(job)
+            elif now >= job["deadline"] + MAX_POSTPROC_TIME:
+                late.append(job)
+        # Containers that could not report to the host may still have finished.
+        finished = run_phase(executor, "poll", check_finished,
+                             [(client, job) for job in late])
+        for (job, is_finished) in zip(late, finished):
+            job["finished"] = is_finished
+            if is_finished:
+                print("%s finished" % job["container"])
             else:
-                print("%s-%s not finished" % (targ_prog, iter_id))
-        if finished_count == total_count:
-            print("All works finished!")
+                print("%s timed out in post-processing" % job["container"])
+            done.append(job)
+        for job in done:
+            journal.record(job, "finished")
+        finish_jobs(client, allocator, journal, executor, done, pool)
+        for job in done:
+            # A campaign stopped early tells nothing about the post-processing.
+            if time.time() >= job["deadline"]:
+                record_cost(job["work"][0], time.time() - job["deadline"])
+            running.remove(job)
+            watcher.forget(status_dir(job), job["container"])
+        if controller is not None:
+            for job in done:
+                controller.record(job, work_dir(job))
+            drop_converged(controller, pending)
+        print("%d works running, %d works pending" % (len(running), len(pending)))
+    if pool is not None:
+        for name in pool.drain():
+            drop_warm_container(client, allocator, name)
+    if executor is not None:
+        executor.shutdown()
+    watcher.close()
+
+
+# Get the cores of 'job' from the idle containers of the pool, when the host
+# has no free cores left: its own warm container gives its core back to be
+# taken over by the job, and only as many other idle containers are dropped as
+# the job needs to get its cores. Returns the lease, or None.
+def acquire_from_pool(client, allocator, pool, job, memory):
+    name = pool.take(pool_key(job))
+    if name is not None:
+        allocator.release(name)
+    lease = allocator.acquire(job["container"], job["cores"], memory)
+    while lease is None:
+        idle = pool.take_any()
+        if idle is None:
             break
+        drop_warm_container(client, allocator, idle)
+        lease = allocator.acquire(job["container"], job["cores"], memory)
+    if name is None:
+        return lease
+    if lease is not None:
+        job["warm_container"] = name
+        return lease
+    # The job has to wait, so the warm container goes back to the pool.
+    warm_lease = lease_warm_container(allocator, name, job)
+    if warm_lease is None:
+        client.kill(name)
+    else:
+        client.update(name, cpuset_str(warm_lease), warm_lease["memory"],
+                      str(warm_lease["node"]))
+        pool.put(pool_key(job), name)
+    return None
 
 
-def store_outputs(works, outdir):
-    for (targ_prog, _, _, iter_id) in works:
-        container = "%s-%s" % (targ_prog, iter_id)
-        cmd = "docker cp %s:/output %s/%s" % (container, outdir, container)
-        run_cmd(cmd)
+def drop_converged(controller, pending):
+    n = len(pending)
+    pending[:] = [job for job in pending if controller.needs(job)]
+    if len(pending) < n:
+        print("Dropped %d works of converged targets" % (n - len(pending)))
 
 
-def cleanup_containers(works):
-    for (targ_prog, _, _, iter_id) in works:
-        cmd = "docker kill %s-%s" % (targ_prog, iter_id)
-        run_cmd(cmd)
+# Warm up containers for the next work items, and kill the idle ones that none
+# of them needs.
+def warm_pool(client, allocator, pool, executor, pending, running):
+    to_warm, to_drop = pool.plan(pending, running, pool_key)
+    run_phase(executor, "cleanup", drop_warm_container,
+              [(client, allocator, name) for name in to_drop])
+    run_phase(executor, "spawn", warm_up_container,
+              [(client, allocator, pool, job) for job in to_warm])
 
 
-def main():
-    if len(sys.argv) != 5:
-        print("Usage: %s <ID> <tool> <time> <iter>" % sys.argv[0])
-        exit(1)
+def finish_jobs(client, allocator, journal, executor, jobs, pool=None):
+    run_phase(executor, "harvest", store_output, [(client, job) for job in jobs])
+    for job in jobs:
+        journal.record(job, "harvested")
+    run_phase(executor, "cleanup", cleanup_container,
+              [(client, allocator, pool, job) for job in jobs])
+    for job in jobs:
+        journal.record(job, "cleaned")
+        allocator.release(job["container"])
+
+
+# Bring the jobs of an interrupted run back to the state in its journal.
+# Returns the jobs still running; works that were harvested are removed from
+# 'pending', and works whose container is gone are left there to be rerun.
+def resume_jobs(client, allocator, journal, outdir, pending):
+    _, entries = read_journal(outdir)
+    running = []
+    to_harvest = []
+    to_cleanup = []
+    for (container, entry) in entries.items():
+        job = dict(entry)
+        del job["state"], job["time"]
+        job["work"] = tuple(job["work"])
+        state = entry["state"]
+        if state in ["harvested", "cleaned"]:
+            pending[:] = [x for x in pending if x["container"] != container]
+            if state == "harvested":
+                to_cleanup.append(job)
+        elif not client.is_running(container):
+            print("%s is gone, will rerun it" % container)
+            # It may still be being removed, and its name is needed again.
+            client.remove(container)
+        elif state == "spawned":
+            # The campaign may not have been launched, so start it over, once
+            # the name of the container is free again.
+            print("%s was not launched, will rerun it" % container)
+            client.remove(container)
+        else:
+            pending[:] = [x for x in pending if x["container"] != container]
+            allocator.claim(container, job["lease"])
+            if state == "finished":
+                to_harvest.append(job)
+            else:
+                print("Reattached to %s" % container)
+                running.append(job)
+    finish_jobs(client, allocator, journal, None, to_harvest)
+    for job in to_cleanup:
+        cleanup_container(client, allocator, None, job)
+        journal.record(job, "cleaned")
+    return running
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("exp_id", metavar="ID")
+    parser.add_argument("tools", metavar="tool",
+                        help="tool to run, or a comma-separated list of tools to "
+                             "run together")
+    parser.add_argument("timelimit", metavar="time", type=int)
+    parser.add_argument("iteration", metavar="iter", type=int)
+    parser.add_argument("--docker-backend", choices=DOCKER_BACKENDS, default="api",
+                        help="how to talk to the Docker daemon (default: api)")
+    parser.add_argument("--async", dest="use_async", action="store_true",
+                        help="run spawn, launch, harvest and cleanup concurrently")
+    parser.add_argument("--resume", action="store_true",
+                        help="resume the latest run of this experiment from its journal")
+    parser.add_argument("--output-mode", choices=OUTPUT_MODES, default="copy",
+                        help="how to bring the output of each campaign to the host "
+                             "(default: copy)")
+    parser.add_argument("--cores", type=int, default=1,
+                        help="cores given to each campaign, each running a parallel "
+                             "fuzzer instance (default: 1)")
+    parser.add_argument("--targets",
+                        help="comma-separated list of targets to run (default: all)")
+    parser.add_argument("--warm-pool", type=int, default=0, metavar="N",
+                        help="keep containers started and staged for the next N "
+                             "work items (default: 0)")
+    parser.add_argument("--early-stop", action="store_true",
+                        help="stop each campaign once it has found the targeted crash")
+    parser.add_argument("--adaptive", action="store_true",
+                        help="stop running iterations of a tool on a target once its "
+                             "median TTE has converged")
+    parser.add_argument("--extend", metavar="OUTDIR",
+                        help="continue the campaigns of a previous output directory, "
+                             "or a comma-separated list of them (one per tool), up to "
+                             "the time limit")
+    return parser.parse_args()
 
-    exp_id = sys.argv[1]
-    tool = sys.argv[2]
-    timelimit = int(sys.argv[3])
-    iteration = int(sys.argv[4])
+
+def main():
+    args = parse_args()
+    exp_id = args.exp_id
+    tools = args.tools.split(",")
+    timelimit = args.timelimit
+    iteration = args.iteration
 
     check_cpu_count()
-    if tool not in SUPPORTED_TOOLS:
-        print("Unsupported tool: %s" % tool)
+    for tool in tools:
+        if tool not in SUPPORTED_TOOLS:
+            print("Unsupported tool: %s" % tool)
+            exit(1)
+    targets = None
+    if args.targets is not None:
+        targets = args.targets.split(",")
+        for targ in targets:
+            if targ not in [x[0] for x in FUZZ_TARGETS]:
+                print("Unsupported target: %s" % targ)
+                exit(1)
+    if args.cores < 1:
+        print("Invalid number of cores per campaign: %d" % args.cores)
         exit(1)
+    old_outdirs = None
+    if args.extend is not None:
+        if args.cores > 1:
+            print("Parallel campaigns cannot be extended")
+            exit(1)
+        old_outdirs = find_extended_outdirs(args.extend, tools)
 
-    worklist = generate_fuzzing_worklist(iteration)
-    outdir = decide_outdir(exp_id, tool)
-    os.makedirs(outdir)
-    while len(worklist) > 0:
-        targ_prog, _, _, _ = worklist[0]
-        timelimit=int(sys.argv[3])
-        works = fetch_works(worklist)
-        spawn_containers(works)
-        run_fuzzing(works, tool, timelimit)
-        wait_finish(works, timelimit)
-        store_outputs(works, outdir)
-        cleanup_containers(works)
+    client = create_docker_client(args.docker_backend)
+    allocator = CoreAllocator(is_running=client.is_running)
+    os.makedirs(SYMBOL_CACHE_DIR, exist_ok=True)
+    # Every tool writes to its own output directory, as if it were run alone.
+    outdirs = {}
+    for tool in tools:
+        if args.resume:
+            outdirs[tool] = find_outdir(exp_id, tool)
+        else:
+            outdirs[tool] = decide_outdir(exp_id, tool)
+            os.makedirs(outdirs[tool])
+    if args.resume and old_outdirs is None:
+        # An extension is resumed as an extension.
+        extended = [read_journal(outdirs[tool])[0].get("extend") for tool in tools]
+        if None not in extended:
+            old_outdirs = dict(zip(tools, extended))
+    # All the tools share one pool of work items, interleaved so that each tool
+    # gets the host at the same time.
+    worklist = generate_fuzzing_worklist(iteration, targets)
+    pending = []
+    for work in worklist:
+        for tool in tools:
+            job = new_job(work, tool, timelimit, outdirs[tool], args.output_mode,
+                          args.cores, args.early_stop)
+            if old_outdirs is None or extend_job(job, old_outdirs[tool]):
+                pending.append(job)
+    pending = order_by_cost(pending, load_history(), lambda job: job["work"][0])
+    if args.adaptive:
+        # Run the iterations round by round, so that every target gets results
+        # early. The cost order is kept within a round.
+        pending.sort(key=lambda job: int(job["work"][3].split("-")[1]))
+    journal = JournalSet(outdirs.values())
+    running = []
+    for tool in tools:
+        if args.resume:
+            running += resume_jobs(client, allocator, journal, outdirs[tool], pending)
+        else:
+            journal.record_experiment(outdirs[tool], {
+                "tool": tool, "timelimit": timelimit, "iteration": iteration,
+                "cores": args.cores, "targets": targets,
+                "early_stop": args.early_stop, "adaptive": args.adaptive,
+                "extend": None if old_outdirs is None else old_outdirs[tool],
+            })
+    pool = None
+    if args.warm_pool > 0:
+        pool = ContainerPool(args.warm_pool)
+    controller = None
+    if args.adaptive:
+        # Needs the analysis scripts (pandas and the verdict cache), which the
+        # orchestrator does not need otherwise.
+        from adaptive import IterationController
+        controller = IterationController(timelimit)
+        # Learn from the works harvested before the interruption.
+        for outdir in outdirs.values():
+            _, entries = read_journal(outdir)
+            for entry in entries.values():
+                if entry["state"] in ["harvested", "cleaned"]:
+                    controller.record(entry, work_dir(entry))
+    schedule_works(client, allocator, journal, pending, running, args.use_async, pool,
+                   controller)
+    journal.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,76 @@
+import os, time, select, ctypes, ctypes.util
+
+# Host directory bind-mounted into each container; common-postproc.sh drops a
+# file named after the container there once the campaign is over.
+STATUS_DIR = ".status"
+CONTAINER_STATUS_DIR = "/host-status"
+# Rescan interval when inotify is not available.
+FALLBACK_INTERVAL = 5
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+
+def init_inotify():
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+    except (OSError, AttributeError):
+        return (None, -1)
+    return (libc, fd)
+
+
+# Learns about finished containers from the status directories instead of
+# running 'cat /STATUS' in every container. inotify only serves to wake up
+# early; the directories are rescanned on every wake-up, so no report is lost.
+class StatusWatcher:
+    def __init__(self):
+        self.dirs = []
+        self.libc, self.fd = init_inotify()
+        if self.fd < 0:
+            print("inotify is not available, scanning status directories every %d sec."
+                  % FALLBACK_INTERVAL)
+
+    def watch(self, status_dir):
+        if status_dir in self.dirs:
+            return
+        os.makedirs(status_dir, exist_ok=True)
+        self.dirs.append(status_dir)
+        if self.fd >= 0:
+            mask = IN_CLOSE_WRITE | IN_MOVED_TO
+            self.libc.inotify_add_watch(self.fd, status_dir.encode(), mask)
+
+    def finished(self):
+        names = set()
+        for status_dir in self.dirs:
+            for name in os.listdir(status_dir):
+                if not name.endswith(".tmp"):
+                    names.add(name)
+        return names
+
+    # Block until one of 'containers' reports, or 'timeout' seconds have
+    # passed. Reports written before the watch started produce no event, so
+    # they are looked for first.
+    def wait(self, timeout, containers):
+        reported = self.finished()
+        if not reported.isdisjoint(containers):
+            return reported
+        timeout = max(timeout, 0)
+        if self.fd < 0:
+            time.sleep(min(timeout, FALLBACK_INTERVAL))
+            return self.finished()
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if len(ready) > 0:
+            os.read(self.fd, 65536) # Drain the events, we rescan anyway.
+        return self.finished()
+
+    def forget(self, status_dir, name):
+        path = os.path.join(status_dir, name)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
@@ -1,408 +1,351 @@
-import re
+import os, re
 TOP_SIG = " #0 "
-
-def warn(msg, buf):
-    # print("[Warning]: %s" % msg)
-    # print("Check the following replay log:")
-    # print(buf)
-    pass
-
-
-# Obtain the function where the crash had occurred.
-def get_crash_func(buf):
-    match = re.search(r"#0 0x[0-9a-f]+ in [\S]+", buf)
-    if match is None:
-        return ""
-    start_idx, end_idx = match.span()
-    line = buf[start_idx:end_idx]
-    return line.split()[-1]
-
-# Get the direct caller of the function that crashed.
-def get_crash_func_caller(buf, idx=1):
-    rstr = "#{}".format(idx) + r" 0x[0-9a-f]+ in [\S]+"
-    match = re.search(rstr, buf)
+ERROR_SIG = "ERROR: "
+EXIT_SIG = "Exit value is "
+START_MARKER = "@@@ start"
+END_MARKER = "@@@ end"
+EXIT_RE = re.compile(r"Exit value is (-?\d+)")
+ERROR_RE = re.compile(r"ERROR: \S+Sanitizer: (\S+)")
+FRAME_RE = re.compile(r"#(\d+) 0x[0-9a-f]+ (?:in (\S+))?(.*)$")
+LOC_RE = re.compile(r"(.+?):(\d+)(?::\d+)?$")
+
+
+# What the checkers need to know about a replay, read from its ASAN report in
+# a single pass: the bug class (e.g. 'heap-buffer-overflow'), the frames of
+# the crashing stack as (function, file, line), the exit value of the replay
+# and the number of '@@@' markers it printed.
+class CrashRecord:
+    def __init__(self):
+        self.bug_class = ""
+        self.frames = []
+        self.locs = set()
+        self.func_names = ""
+        self.exit_value = None
+        self.starts = 0
+        self.ends = 0
+
+
+def parse_frame(line):
+    match = FRAME_RE.match(line)
     if match is None:
-        return ""
-    start_idx, end_idx = match.span()
-    line = buf[start_idx:end_idx]
-    return line.split()[-1]
-
-
-# Helper function for for-all check.
-def check_all(buf, checklist):
-    for str_to_check in checklist:
-        if str_to_check not in buf:
-            return False
-    return True
-
-
-# Helper function for if-any check.
-def check_any(buf, checklist):
-    for str_to_check in checklist:
-        if str_to_check in buf:
-            return True
-    return False
-
-
-def check_cxxfilt_2016_4487(buf):
-    if get_crash_func(buf) == "register_Btype":
-        if "cplus-dem.c:4319" in buf:
-            return True
-        else:
-            warn("Unexpected crash point in register_Btype()", buf)
-            return False
-    else:
-        return False
-
-
-def check_cxxfilt_2016_4489(buf):
+        return None
+    func = match.group(2) or ""
+    loc = match.group(3).split()
+    if len(loc) > 0 and not loc[-1].startswith("("):
+        match = LOC_RE.match(loc[-1])
+        if match is not None:
+            return (func, os.path.basename(match.group(1)), int(match.group(2)))
+    return (func, "", 0)
+
+
+# Only the first stack of the report is kept, which is where the crash occurred
+# (the following ones are where the memory was allocated or freed).
+def parse_report(buf):
+    rec = CrashRecord()
+    in_stack = False
+    stack_done = False
+    for line in buf.split("\n"):
+        line = line.lstrip()
+        if line.startswith("#"):
+            if stack_done:
+                continue
+            frame = parse_frame(line)
+            if frame is not None:
+                rec.frames.append(frame)
+                in_stack = True
+                continue
+        if in_stack:
+            in_stack = False
+            stack_done = True
+        # A replay killed on timeout may not end its output with a newline,
+        # so the exit value and the markers can be glued to other output.
+        if EXIT_SIG in line:
+            match = EXIT_RE.search(line)
+            if match is not None:
+                rec.exit_value = int(match.group(1))
+        if "@@@ " in line:
+            rec.starts += line.count(START_MARKER)
+            rec.ends += line.count(END_MARKER)
+        if ERROR_SIG in line and rec.bug_class == "":
+            match = ERROR_RE.search(line)
+            if match is not None:
+                rec.bug_class = match.group(1)
+    for (func, file_name, line_num) in rec.frames:
+        if file_name != "":
+            rec.locs.add("%s:%d" % (file_name, line_num))
+    rec.func_names = "\n".join([x[0] for x in rec.frames])
+    return rec
+
+
+# Triage rules of the targeted bugs, as data. A crash matches a rule if it
+# meets every condition the rule has:
+#   "class": the bug class is one of these,
+#   "not_class": the bug class is none of these,
+#   "locs": the crashing stack passes through one of these (file, lines),
+#   "frame": (depth, names): the function at this depth is one of these,
+#   "funcs": all of these are on the crashing stack (names, or parts of names),
+#   "not_funcs": groups of functions that must not be on the stack together,
+#   "exit": the exit value of the replay,
+#   "unbalanced": more '@@@ start' markers were printed than '@@@ end' ones.
+TRIAGE_RULES = {
+    "cxxfilt-2016-4487": {
+        "frame": (0, ["register_Btype"]),
+        "locs": [("cplus-dem.c", [4319])]},
     # Checking for "string_appendn" can be loose, since it has many call-sites.
     # Therefore, check for the specific call-site in gnu_special().
-    return check_all(buf, ["cplus-dem.c:3007"])
-
-
-def check_cxxfilt_2016_4490(buf):
-    if get_crash_func(buf) == "d_unqualified_name":
-        if "cp-demangle.c:1596" in buf or "cp-demangle.c:1597" in buf:
-            return True
-        elif "cp-demangle.c:1576" in buf:
-            # Although crash point is slightly different, has the same root
-            # cause (integer overflow in d_source_name).
-            return True
-        else:
-            warn("Unexpected crash point in d_unqualified_name()", buf)
-            return False
-    else:
+    "cxxfilt-2016-4489": {
+        "locs": [("cplus-dem.c", [3007])]},
+    # Line 1576 is a slightly different crash point, but has the same root
+    # cause (integer overflow in d_source_name).
+    "cxxfilt-2016-4490": {
+        "frame": (0, ["d_unqualified_name"]),
+        "locs": [("cp-demangle.c", [1596, 1597, 1576])]},
+    "cxxfilt-2016-4491": {
+        "class": ["stack-overflow"],
+        "funcs": ["d_print_comp", "d_print_mod", "d_print_array_type",
+                  "d_print_comp_inner", "d_print_mod_list"]},
+    # typevec[] accessing points, or the callsites of do_type() if its line
+    # num is gone: do_arg() -> do_type() and iterate_demangle_function() ->
+    # demangle_signature() -> do_type().
+    "cxxfilt-2016-4492": {
+        "not_class": ["stack-overflow"],
+        "frame": (0, ["do_type"]),
+        "locs": [("cplus-dem.c", [3606, 3781, 4231, 1548, 1595])]},
+    "cxxfilt-2016-6131": {
+        "class": ["stack-overflow"],
+        "funcs": ["do_type", "demangle_arm_hp_template", "demangle_class_name",
+                  "demangle_fund_type"]},
+    "swftophp-2016-9827": {
+        "class": ["heap-buffer-overflow"],
+        "locs": [("outputscript.c", [1687])]},
+    "swftophp-2016-9829": {
+        "class": ["heap-buffer-overflow"],
+        "locs": [("parser.c", [1656])]},
+    # Any BOF that occurs in line 66~69 corresponds to this CVE.
+    "swftophp-2016-9831": {
+        "class": ["heap-buffer-overflow"],
+        "locs": [("parser.c", range(66, 70))]},
+    "swftophp-2017-9988": {
+        "class": ["SEGV"],
+        "locs": [("parser.c", [2995])]},
+    "swftophp-2017-11728": {
+        "class": ["heap-buffer-overflow"],
+        "locs": [("decompile.c", [868])],
+        "frame": (1, ["decompileSETMEMBER"])},
+    "swftophp-2017-11729": {
+        "class": ["heap-buffer-overflow"],
+        "locs": [("decompile.c", [868])],
+        "frame": (1, ["decompileINCR_DECR"])},
+    # Any BOF that occurs in line 68~71 corresponds to this CVE.
+    "swftophp-2017-7578": {
+        "class": ["heap-buffer-overflow"],
+        "locs": [("parser.c", range(68, 72))]},
+    # We should exclude SEGV because it's issue-122 (NULL dereference). Also,
+    # exclude UAF because it's likely CVE-2018-8962. If getString and sprintf
+    # are observed, it's likely CVE-2018-7873 or CVE-2018-7867.
+    "swftophp-2018-7868": {
+        "class": ["heap-buffer-overflow"],
+        "locs": [("decompile.c", [398])],
+        "not_funcs": [["getString", "sprintf"]]},
+    # Consider the crash at "decompile.c:398" as the same CVE (referred to the
+    # various stack traces in CVE-2018-8962). Crash also occurs at the caller
+    # itself. Conservatively say no.
+    "swftophp-2018-8807": {
+        "class": ["heap-use-after-free"],
+        "locs": [("decompile.c", [349, 398])],
+        "frame": (2, ["decompileCALLFUNCTION"])},
+    "swftophp-2018-8962": {
+        "class": ["heap-use-after-free"],
+        "locs": [("decompile.c", [349, 398])],
+        "frame": (1, ["decompileGETVARIABLE",
+                      "decompileSingleArgBuiltInFunctionCall",
+                      "decompilePUSHPARAM",
+                      "decompileDELETE",
+                      "decompileSETTARGET",
+                      "decompileSUBSTRING",
+                      "decompileNEWOBJECT"])},
+    # Accept both SEGV and BOF (cf. GitHub report and our PoC replay)
+    "swftophp-2018-11095": {
+        "class": ["heap-buffer-overflow", "SEGV"],
+        "locs": [("decompile.c", [1843])]},
+    "swftophp-2018-11225": {
+        "class": ["heap-buffer-overflow"],
+        "locs": [("decompile.c", [2015])]},
+    "swftophp-2018-11226": {
+        "class": ["heap-buffer-overflow"],
+        "locs": [("decompile.c", [2015])]},
+    "swftophp-2020-6628": {
+        "class": ["heap-buffer-overflow"],
+        "locs": [("decompile.c", [2015])]},
+    "swftophp-2018-20427": {
+        "class": ["SEGV"],
+        "locs": [("decompile.c", [425])]},
+    "swftophp-2019-12982": {
+        "class": ["heap-buffer-overflow"],
+        "locs": [("decompile.c", [3120])]},
+    # Possible crash points in strcpyext (all corresponds to this CVE).
+    "swftophp-2019-9114": {
+        "class": ["heap-buffer-overflow"],
+        "locs": [("decompile.c", [254, 256, 259, 261])],
+        "frame": (1, ["getName"])},
+    # unzip_match() is the function modified in the final patch.
+    "lrzip-2017-8846": {
+        "class": ["heap-use-after-free"],
+        "locs": [("stream.c", [1747])],
+        "funcs": ["unzip_match"]},
+    # Not sure about the read_u32 caller. Conservatively say no.
+    "lrzip-2018-11496": {
+        "class": ["heap-use-after-free"],
+        "locs": [("stream.c", [1756])],
+        "funcs": ["read_header"],
+        "not_funcs": [["read_u32"]]},
+    "objdump-2017-8392": {
+        "class": ["heap-buffer-overflow"],
+        "funcs": ["read_4_bytes"]},
+    "objdump-2017-8396": {
+        "class": ["heap-buffer-overflow"],
+        "frame": (0, ["bfd_getl64"])},
+    "objdump-2017-8397": {
+        "class": ["heap-buffer-overflow"],
+        "frame": (0, ["bfd_perform_relocation"])},
+    "objdump-2017-8398": {
+        "class": ["heap-buffer-overflow"],
+        "funcs": ["process_extended_line_op"]},
+    "objdump-2018-17360": {
+        "class": ["heap-buffer-overflow"],
+        "funcs": ["pe_print_edata"]},
+    "objcopy-2017-8393": {
+        "class": ["global-buffer-overflow"],
+        "funcs": ["_bfd_elf_get_reloc_section"]},
+    "objcopy-2017-8394": {
+        "class": ["SEGV"],
+        "frame": (0, ["filter_symbols"])},
+    "objcopy-2017-8395": {
+        "class": ["SEGV"],
+        "funcs": ["cache_bread_1"]},
+    "nm-2017-14940": {
+        "exit": 137,
+        "unbalanced": True},
+    "readelf-2017-16828": {
+        "class": ["heap-buffer-overflow"],
+        "funcs": ["display_debug_frames"]},
+    "strip-2017-7303": {
+        "class": ["SEGV"],
+        "funcs": ["find_link"]},
+    "xmllint-2017-5969": {
+        "class": ["SEGV"],
+        "locs": [("valid.c", [1181])]},
+    # Both over- and under-flow.
+    "xmllint-2017-9047": {
+        "class": ["stack-buffer-overflow", "stack-buffer-underflow"],
+        "locs": [("valid.c", [1279])]},
+    "xmllint-2017-9048": {
+        "class": ["stack-buffer-overflow", "stack-buffer-underflow"],
+        "locs": [("valid.c", [1323])]},
+    "cjpeg-2018-14498": {
+        "class": ["heap-buffer-overflow"],
+        "locs": [("rdbmp.c", [209])]},
+    "cjpeg-2020-13790": {
+        "class": ["heap-buffer-overflow"],
+        "locs": [("rdppm.c", [434])]},
+}
+
+
+# Get the function at 'idx' of the crashing stack (0 is where the crash had
+# occurred, 1 its direct caller, and so on).
+def get_crash_func(rec, idx=0):
+    if idx >= len(rec.frames):
+        return ""
+    return rec.frames[idx][0]
+
+
+# Turn a rule of TRIAGE_RULES into sets, so that it is checked with a few set
+# operations.
+def compile_rule(rule):
+    locs = None
+    if "locs" in rule:
+        locs = set()
+        for (file_name, lines) in rule["locs"]:
+            locs.update(["%s:%d" % (file_name, x) for x in lines])
+    frame = None
+    if "frame" in rule:
+        frame = (rule["frame"][0], frozenset(rule["frame"][1]))
+    return {"class": frozenset(rule["class"]) if "class" in rule else None,
+            "not_class": frozenset(rule.get("not_class", [])),
+            "locs": frozenset(locs) if locs is not None else None,
+            "frame": frame,
+            "funcs": frozenset(rule.get("funcs", [])),
+            "not_funcs": [frozenset(x) for x in rule.get("not_funcs", [])],
+            "exit": rule.get("exit"),
+            "unbalanced": rule.get("unbalanced", False)}
+
+
+# All the function names of the rules go into one regex, so that a single scan
+# of the crashing stack finds which of them are there. Names are tried longest
+# first, and a match also counts for the names that are part of it (e.g.
+# 'd_print_comp' in 'd_print_comp_inner').
+def compile_func_tokens(rules):
+    tokens = set()
+    for rule in rules.values():
+        tokens.update(rule["funcs"])
+        for group in rule["not_funcs"]:
+            tokens.update(group)
+    tokens = sorted(tokens, key=lambda x: (-len(x), x))
+    implied = {}
+    for token in tokens:
+        implied[token] = frozenset([x for x in tokens if x in token])
+    if len(tokens) == 0:
+        return (None, implied)
+    return (re.compile("|".join([re.escape(x) for x in tokens])), implied)
+
+
+COMPILED_RULES = dict([(name, compile_rule(rule)) for (name, rule) in TRIAGE_RULES.items()])
+FUNC_TOKEN_RE, IMPLIED_TOKENS = compile_func_tokens(COMPILED_RULES)
+
+
+# The function names of the rules found in the crashing stack of 'rec'.
+def find_func_tokens(rec):
+    found = set()
+    if FUNC_TOKEN_RE is None:
+        return found
+    for match in FUNC_TOKEN_RE.finditer(rec.func_names):
+        found.update(IMPLIED_TOKENS[match.group(0)])
+    return found
+
+
+def match_rule(rule, rec, func_tokens):
+    if rule["class"] is not None and rec.bug_class not in rule["class"]:
         return False
-
-
-def check_cxxfilt_2016_4491(buf):
-    return check_all(buf, ["stack-overflow", "d_print_comp", "d_print_mod", "d_print_array_type", "d_print_comp_inner", "d_print_mod_list"])
-
-
-def check_cxxfilt_2016_4492(buf):
-    if "stack-overflow" in buf:
+    if rec.bug_class in rule["not_class"]:
         return False
-    if get_crash_func(buf) == "do_type":
-        if check_any(buf, ["cplus-dem.c:3606", "cplus-dem.c:3781"]):
-            # typevec[] accessing points.
-            return True
-        # If do_type()'s line num is gone, rely on the callsite's line num.
-        elif "cplus-dem.c:4231" in buf:
-            # do_arg() -> do_type()
-            return True
-        elif "cplus-dem.c:1548" in buf or "cplus-dem.c:1595" in buf:
-            # iterate_demangle_function() -> demangle_signature() -> do_type()
-            return True
-        else:
-            warn("Unexpected crash point in do_type", buf)
-            return False
-    else:
+    if rule["locs"] is not None and rule["locs"].isdisjoint(rec.locs):
         return False
-
-
-def check_cxxfilt_2016_6131(buf):
-    if check_all(buf, ["stack-overflow", "do_type"]):
-        if check_all(buf, ["demangle_arm_hp_template", "demangle_class_name", "demangle_fund_type"]):
-            warn("Unexpected crash point in do_type", buf)
-            return True
-    return False
-
-
-def check_swftophp_2016_9827(buf):
-    if "heap-buffer-overflow" in buf:
-        if "outputscript.c:1687:" in buf:
-            return True
-    return False
-
-
-def check_swftophp_2016_9829(buf):
-    if "heap-buffer-overflow" in buf:
-        if "parser.c:1656:" in buf:
-            return True
-    return False
-
-
-def check_swftophp_2016_9831(buf):
-    if "heap-buffer-overflow" in buf:
-        # Any BOF that occurs in line 66~69 corresponds to this CVE.
-        if re.search(r"parser.c:6[6-9]:", buf) is not None:
-            return True
-    return False
-
-
-def check_swftophp_2017_9988(buf):
-    if "SEGV" in buf:
-        if "parser.c:2995:" in buf:
-            return True
-    return False
-
-
-def check_swftophp_2017_11728(buf):
-    if "heap-buffer-overflow" in buf:
-        if "decompile.c:868" in buf:
-            if get_crash_func_caller(buf) == "decompileSETMEMBER":
-                return True
-    return False
-
-
-def check_swftophp_2017_11729(buf):
-    if "heap-buffer-overflow" in buf:
-        if "decompile.c:868" in buf:
-            if get_crash_func_caller(buf) == "decompileINCR_DECR":
-                return True
-    return False
-
-
-def check_swftophp_2017_7578(buf):
-    if "heap-buffer-overflow" in buf:
-        # Any BOF that occurs in line 68~71 corresponds to this CVE.
-        if re.search(r"parser.c:(68|69|70|71):", buf) is not None:
-            return True
-    return False
-
-
-def check_swftophp_2018_7868(buf):
-    # We should exclude SEGV because it's issue-122 (NULL dereference). Also,
-    # exclude UAF because it's likely CVE-2018-8962.
-    if "heap-buffer-overflow" in buf:
-        if check_all(buf, ["getString", "sprintf"]):
-            # If these are observed, it's likely CVE-2018-7873 or CVE-2018-7867.
+    if rule["frame"] is not None:
+        depth, names = rule["frame"]
+        if get_crash_func(rec, depth) not in names:
             return False
-        elif "decompile.c:398" in buf:
-            return True
-        elif "decompile.c:408" in buf:
-            # This is CVE-2018-7871.
+    if not rule["funcs"] <= func_tokens:
+        return False
+    for group in rule["not_funcs"]:
+        if group <= func_tokens:
             return False
-        elif "getName" in buf:
-            warn("Unexpected heap BOF within getName", buf)
-    return False
-
-
-def check_swftophp_2018_8807(buf):
-    if "heap-use-after-free" in buf:
-        # Consider the crash at "decompile.c:398" as the same CVE (referred to
-        # the various stack traces in CVE-2018-8962).
-        if check_any(buf, ["decompile.c:349", "decompile.c:398"]):
-            if get_crash_func_caller(buf, 2) == "decompileCALLFUNCTION":
-                return True
-        # Crash also occurs at the caller itself. Conservatively say no.
-    return False
-
-
-def check_swftophp_2018_8962(buf):
-    possible_callers = ["decompileGETVARIABLE",
-                        "decompileSingleArgBuiltInFunctionCall",
-                        "decompilePUSHPARAM",
-                        "decompileDELETE",
-                        "decompileSETTARGET",
-                        "decompileSUBSTRING",
-                        "decompileNEWOBJECT"]
-    if "heap-use-after-free" in buf:
-        if check_any(buf, ["decompile.c:349", "decompile.c:398"]):
-            if get_crash_func_caller(buf) in possible_callers:
-                return True
-        # Crash also occurs at the caller itself. Conservatively say no.
-    return False
-
-
-def check_swftophp_2018_11095(buf):
-    # Accept both SEGV and BOF (cf. GitHub report and our PoC replay)
-    if check_any(buf, ["heap-buffer-overflow", "SEGV"]):
-        if "decompile.c:1843:" in buf:
-            return True
-        elif get_crash_func(buf) == "decompileJUMP":
-            warn("Unexpected crash point in decompileJUMP", buf)
-    return False
-
-
-def check_swftophp_2018_11225(buf):
-    if "heap-buffer-overflow" in buf:
-        if "decompile.c:2015:" in buf:
-            return True
-        elif get_crash_func(buf) == "decompile_SWITCH":
-            warn("Unexpected crash point in decompile_SWITCH", buf)
-    return False
-
-def check_swftophp_2018_11226(buf):
-    if "heap-buffer-overflow" in buf:
-        if "decompile.c:2015:" in buf:
-            return True
-        elif get_crash_func(buf) == "decompile_SWITCH":
-            warn("Unexpected crash point in decompile_SWITCH", buf)
-    return False
-
-def check_swftophp_2020_6628(buf):
-    if "heap-buffer-overflow" in buf:
-        if "decompile.c:2015:" in buf:
-            return True
-        elif get_crash_func(buf) == "decompile_SWITCH":
-            warn("Unexpected crash point in decompile_SWITCH", buf)
-    return False
-
-def check_swftophp_2018_20427(buf):
-    if "SEGV" in buf:
-        if "decompile.c:425:" in buf:
-            return True
-    return False
-
-
-def check_swftophp_2019_12982(buf):
-    if "heap-buffer-overflow" in buf:
-        if "decompile.c:3120:" in buf:
-            return True
-    return False
-
-
-def check_swftophp_2019_9114(buf):
-    if "heap-buffer-overflow" in buf:
-        # Possible crash points in strcpyext (all corresponds to this CVE).
-        if re.search(r"decompile.c:2(54|56|59|61):", buf) is not None:
-            if get_crash_func_caller(buf) == "getName":
-                return True
-            else:
-                warn("Unexpected caller of strcpyext", buf)
-    return False
-
-def check_lrzip_2017_8846(buf):
-    if "heap-use-after-free" in buf:
-        if "stream.c:1747" in buf:
-            # Following is the function modified in the final patch
-            if "unzip_match" in buf:
-                return True
-            else:
-                warn("Unexpected stack trace", buf)
-        elif get_crash_func(buf) == "read_stream" :
-            warn("Unexpected crash point in read_stream", buf)
-    return False
-
-def check_lrzip_2018_11496(buf):
-    if "heap-use-after-free" in buf:
-        if "stream.c:1756" in buf:
-            # Not sure about this caller. Conservatively say no.
-            if "read_u32" in buf:
-                return False
-            elif "read_header" in buf:
-                return True
-            else:
-                warn("Unexpected stack trace", buf)
-        elif get_crash_func(buf) == "read_stream" :
-            warn("Unexpected crash point in read_stream", buf)
-    return False
-
-
-def check_objdump_2017_8392(buf):
-    if "heap-buffer-overflow" in buf:
-        if "read_4_bytes" in buf:
-            return True
-    return False
-
-
-def check_objdump_2017_8396(buf):
-    if "heap-buffer-overflow" in buf:
-        if get_crash_func(buf) == "bfd_getl64":
-            return True
-    return False
-
-
-def check_objdump_2017_8397(buf):
-    if "heap-buffer-overflow" in buf:
-        if get_crash_func(buf) == "bfd_perform_relocation":
-            return True
-    return False
-
-
-def check_objdump_2017_8398(buf):
-    if "heap-buffer-overflow" in buf:
-        if "process_extended_line_op" in buf:
-            return True
-    return False
-
-def check_objdump_2018_17360(buf):
-    if "heap-buffer-overflow" in buf:
-        if "pe_print_edata" in buf:
-            return True
-    return False
-
-def check_objcopy_2017_8393(buf):
-    if "global-buffer-overflow" in buf:
-        if "_bfd_elf_get_reloc_section" in buf:
-            return True
-    return False
-
-
-def check_objcopy_2017_8394(buf):
-    if "SEGV" in buf:
-        if get_crash_func(buf) == "filter_symbols":
-            return True
-    return False
-
-
-def check_objcopy_2017_8395(buf):
-    if "SEGV" in buf:
-        if "cache_bread_1" in buf:
-            return True
-    return False
-
-def check_nm_2017_14940(buf):
-    if "Exit value is 137" in buf:
-        starts = buf.count('@@@ start')
-        ends = buf.count('@@@ end')
-        if starts > 0 and starts > ends :
-            return True
-    return False
-
-def check_readelf_2017_16828(buf):
-    if "heap-buffer-overflow" in buf:
-        if "display_debug_frames" in buf:
-            return True
-    return False
-
-def check_strip_2017_7303(buf):
-    if "SEGV" in buf:
-        if "find_link" in buf:
-            return True
-    return False
-
-def check_xmllint_2017_5969(buf):
-    if "SEGV" in buf:
-        if "valid.c:1181:" in buf:
-            return True
-    return False
-
-
-def check_xmllint_2017_9047(buf):
-    if "stack-buffer" in buf: # Both over- and under-flow.
-        if "valid.c:1279:" in buf:
-            return True
-    return False
-
-
-def check_xmllint_2017_9048(buf):
-    if "stack-buffer" in buf: # Both over- and under-flow.
-        if "valid.c:1323:" in buf:
-            return True
-    return False
-
-
-def check_cjpeg_2018_14498(buf):
-    if "heap-buffer-overflow" in buf:
-        if "rdbmp.c:209:" in buf:
-            return True
-        elif get_crash_func(buf) == "get_8bit_row":
-            warn("Unexpected crash point in get_8bit_row", buf)
-    return False
+    if rule["exit"] is not None and rec.exit_value != rule["exit"]:
+        return False
+    if rule["unbalanced"] and not (rec.starts > 0 and rec.starts > rec.ends):
+        return False
+    return True
 
 
-def check_cjpeg_2020_13790(buf):
-    if "heap-buffer-overflow" in buf:
-        if "rdppm.c:434:" in buf:
-            return True
-        elif get_crash_func(buf) == "get_rgb_row":
-            warn("Unexpected crash point in get_rgb_row", buf)
-    return False
+# Check whether 'rec' is the bug of the rule 'rule_name'.
+def check_rule(rule_name, rec):
+    return match_rule(COMPILED_RULES[rule_name], rec, find_func_tokens(rec))
 
 
-def check_TODO(buf):
-    print("TODO: implement triage logic")
-    return False
+# Names of all the rules that 'rec' matches, with a single scan of its stack.
+def match_rules(rec):
+    func_tokens = find_func_tokens(rec)
+    matched = []
+    for (rule_name, rule) in COMPILED_RULES.items():
+        if match_rule(rule, rec, func_tokens):
+            matched.append(rule_name)
+    return matched
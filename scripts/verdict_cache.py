@@ -0,0 +1,99 @@
+import os, time, atexit, sqlite3, hashlib, threading
+from triage import parse_report, check_rule, get_crash_func
+from benchmark import TARGET_RULES
+
+BASE_DIR = os.path.join(os.path.dirname(__file__), os.pardir)
+# Shared by every analysis script, so that a replay is triaged only once.
+CACHE_FILE = os.path.join(BASE_DIR, "output", "triage_cache.db")
+# Verdicts depend on the triage rules and on which rule each target uses.
+RULE_FILES = ["triage.py", "benchmark.py"]
+COMMIT_INTERVAL = 1000
+# The verdicts of a rule version that no checkout opened for this long are
+# dropped.
+VERSION_TTL = 30 * 86400
+
+
+# Hash of the triage rules. When a rule or the report parser changes, the
+# verdicts of the previous version are no longer looked up. Several checkouts
+# with different rules may share the cache, so the verdicts of a version are
+# only dropped once no checkout has used it for VERSION_TTL.
+def rule_version():
+    h = hashlib.sha1()
+    for name in RULE_FILES:
+        f = open(os.path.join(os.path.dirname(os.path.abspath(__file__)), name), "rb")
+        h.update(f.read())
+        f.close()
+    return h.hexdigest()
+
+
+# Triage verdicts of replay items, keyed by (target, hash of the item, rule
+# version), with the bug class and crash function of the item.
+class VerdictCache:
+    def __init__(self, cache_file=CACHE_FILE):
+        self.version = rule_version()
+        self.lock = threading.Lock()
+        self.pending = 0
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        self.conn = sqlite3.connect(cache_file, timeout=60, check_same_thread=False)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS verdicts (target TEXT, item BLOB, "
+                          "version TEXT, verdict INTEGER, bug_class TEXT, crash_func TEXT, "
+                          "PRIMARY KEY (target, item, version))")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS verdicts_version ON verdicts (version)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS versions (version TEXT PRIMARY KEY, "
+                          "last_used REAL)")
+        now = time.time()
+        # Versions written before their use was recorded start from now.
+        self.conn.execute("INSERT OR IGNORE INTO versions SELECT DISTINCT version, ? "
+                          "FROM verdicts", (now,))
+        self.conn.execute("INSERT OR REPLACE INTO versions VALUES (?, ?)", (self.version, now))
+        stale = "SELECT version FROM versions WHERE last_used < ?"
+        self.conn.execute("DELETE FROM verdicts WHERE version IN (%s)" % stale,
+                          (now - VERSION_TTL,))
+        self.conn.execute("DELETE FROM versions WHERE last_used < ?", (now - VERSION_TTL,))
+        self.conn.commit()
+
+    # Returns (verdict, bug class, crash function) of 'replay_buf' for 'targ'.
+    # The item can be given as bytes (e.g. a view of a mapped replay log), in
+    # which case it is only decoded when its verdict is not cached.
+    def lookup(self, targ, replay_buf):
+        if targ not in TARGET_RULES:
+            print("Unknown target: %s" % targ)
+            exit(1)
+        if isinstance(replay_buf, str):
+            replay_buf = replay_buf.encode("latin-1")
+        item = hashlib.sha1(replay_buf).digest()
+        with self.lock:
+            row = self.conn.execute("SELECT verdict, bug_class, crash_func FROM verdicts "
+                                    "WHERE target = ? AND item = ? AND version = ?",
+                                    (targ, item, self.version)).fetchone()
+        if row is not None:
+            return (row[0] == 1, row[1], row[2])
+        rec = parse_report(str(replay_buf, "latin-1"))
+        result = (check_rule(TARGET_RULES[targ], rec), rec.bug_class, get_crash_func(rec))
+        with self.lock:
+            self.conn.execute("INSERT OR REPLACE INTO verdicts VALUES (?, ?, ?, ?, ?, ?)",
+                              (targ, item, self.version, int(result[0]), result[1], result[2]))
+            self.pending += 1
+            if self.pending >= COMMIT_INTERVAL:
+                self.conn.commit()
+                self.pending = 0
+        return result
+
+    def close(self):
+        with self.lock:
+            self.conn.commit()
+            self.conn.close()
+
+
+cache = None
+cache_lock = threading.Lock()
+
+
+# Cached version of benchmark.check_targeted_crash().
+def check_targeted_crash(targ, replay_buf):
+    global cache
+    with cache_lock:
+        if cache is None:
+            cache = VerdictCache()
+            atexit.register(cache.close)
+    return cache.lookup(targ, replay_buf)[0]